@@ -2,21 +2,48 @@
 Python API for edx_name_affirmation.
 """
 
+import base64
+import binascii
 import logging
 
-from django.core.exceptions import ObjectDoesNotExist
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from edx_name_affirmation.caching import (
+    HAS_VERIFIED_NAMES,
+    get_or_set_user_value,
+    get_user_values,
+    invalidate_user_cache,
+    set_user_values
+)
 from edx_name_affirmation.exceptions import (
     VerifiedNameAttemptIdNotGiven,
     VerifiedNameDoesNotExist,
     VerifiedNameEmptyString,
+    VerifiedNameHistoryInvalidCursor,
     VerifiedNameMultipleAttemptIds
 )
 from edx_name_affirmation.models import VerifiedName, VerifiedNameConfig
+from edx_name_affirmation.signals import send_verified_name_approved
 from edx_name_affirmation.statuses import VerifiedNameStatus
 
 log = logging.getLogger(__name__)
 
+# Maximum number of users resolved by a single query in the bulk lookups below
+BULK_QUERY_CHUNK_SIZE = 1000
+
+# Page sizes of the VerifiedName history, unless overridden by the VERIFIED_NAME_HISTORY_PAGE_SIZE
+# and VERIFIED_NAME_HISTORY_MAX_PAGE_SIZE settings
+DEFAULT_HISTORY_PAGE_SIZE = 20
+DEFAULT_HISTORY_MAX_PAGE_SIZE = 100
+
 
 def create_verified_name(
     user, verified_name, profile_name, verification_attempt_id=None,
@@ -90,16 +117,68 @@ def get_verified_name(user, is_verified=False, statuses_to_exclude=None):
           relevant if `is_verified` is False.
 
     Returns a VerifiedName object.
-    """
-    verified_name_qs = VerifiedName.objects.filter(user=user).order_by('-created')
 
+    Results are cached per user and per combination of filters, and invalidated whenever
+    one of the user's VerifiedNames changes. Whether the user has any VerifiedName at all is
+    cached as well, so that users without one are answered without a query for every filter.
+    """
     if is_verified:
-        return verified_name_qs.filter(status=VerifiedNameStatus.APPROVED.value).first()
+        cache_name = 'verified_name.verified'
+    else:
+        cache_name = 'verified_name.excluding.' + ','.join(sorted(
+            getattr(status, 'value', str(status)) for status in statuses_to_exclude or ()
+        ))
+
+    cache_version, cached_values = get_user_values(user.id, [HAS_VERIFIED_NAMES, cache_name])
+    if cached_values.get(HAS_VERIFIED_NAMES) is False:
+        return None
+    if cache_name in cached_values:
+        return cached_values[cache_name]
+
+    verified_name_obj = _get_latest_verified_name(user, is_verified, statuses_to_exclude)
+
+    values_to_cache = {cache_name: verified_name_obj}
+    if verified_name_obj:
+        values_to_cache[HAS_VERIFIED_NAMES] = True
+    elif HAS_VERIFIED_NAMES not in cached_values:
+        is_unfiltered = not (is_verified or statuses_to_exclude)
+        values_to_cache[HAS_VERIFIED_NAMES] = False if is_unfiltered else _has_verified_names(user)
+    set_user_values(user.id, cache_version, values_to_cache)
 
-    if statuses_to_exclude:
-        return verified_name_qs.exclude(status__in=statuses_to_exclude).first()
+    return verified_name_obj
+
+
+def get_verified_names(user_ids, is_verified=False, statuses_to_exclude=None):
+    """
+    Get the most recent VerifiedName for each of the given users.
+
+    This is the bulk counterpart to `get_verified_name`, and applies the same filters. Rather
+    than issuing one query per user, the most recent VerifiedName of every user in a chunk of
+    `BULK_QUERY_CHUNK_SIZE` users is selected by a single query using a correlated subquery.
+
+    Arguments:
+        * `user_ids` (iterable of int)
+        * `is_verified` (bool): Optional, set to True to ignore entries that are not
+          verified.
+        * `statuses_to_exclude` (list): Optional list of statuses to filter out. Only
+          relevant if `is_verified` is False.
 
-    return verified_name_qs.first()
+    Returns a dict mapping each user_id to a VerifiedName object. Users without a matching
+    VerifiedName are not included.
+    """
+    latest_verified_name_id = _filter_verified_names(
+        VerifiedName.objects.filter(user_id=OuterRef('user_id')), is_verified, statuses_to_exclude,
+    ).order_by('-created', '-id').values('id')[:1]
+
+    verified_names = {}
+    for user_id_chunk in _chunked(user_ids, BULK_QUERY_CHUNK_SIZE):
+        verified_name_qs = VerifiedName.objects.filter(
+            user_id__in=user_id_chunk,
+            id=Subquery(latest_verified_name_id),
+        )
+        verified_names.update((verified_name.user_id, verified_name) for verified_name in verified_name_qs)
+
+    return verified_names
 
 
 def delete_verified_name(verified_name_id):
@@ -125,7 +204,55 @@ def get_verified_name_history(user):
     Arguments:
         * `user` (User object)
     """
-    return VerifiedName.objects.filter(user=user).order_by('-created')
+    if not _may_have_verified_names(user):
+        return VerifiedName.objects.none()
+
+    return VerifiedName.objects.filter(user=user).select_related('user').order_by('-created', '-id')
+
+
+def get_verified_name_history_page(user, page_size=None, cursor=None):
+    """
+    Return one page of the VerifiedNames for a given user, ordered by the date created from
+    most recent.
+
+    Pages are selected by keyset on (created, id) rather than by offset, so every page is
+    read from the index no matter how long the user's history is.
+
+    Arguments:
+        * `user` (User object)
+        * `page_size` (int): Optional number of VerifiedNames per page. Defaults to the
+          VERIFIED_NAME_HISTORY_PAGE_SIZE setting, and is capped by the
+          VERIFIED_NAME_HISTORY_MAX_PAGE_SIZE setting.
+        * `cursor` (str): Optional cursor returned with the previous page. The first page is
+          returned if it is not given.
+
+    Returns a tuple of the list of VerifiedNames in the page, and the cursor of the next page
+    (None if this is the last page).
+    """
+    max_page_size = getattr(settings, 'VERIFIED_NAME_HISTORY_MAX_PAGE_SIZE', DEFAULT_HISTORY_MAX_PAGE_SIZE)
+    page_size = page_size or getattr(settings, 'VERIFIED_NAME_HISTORY_PAGE_SIZE', DEFAULT_HISTORY_PAGE_SIZE)
+    page_size = min(page_size, max_page_size)
+
+    if cursor:
+        created, verified_name_id = _decode_history_cursor(cursor)
+
+    if not _may_have_verified_names(user):
+        return [], None
+
+    verified_name_qs = VerifiedName.objects.filter(user=user).select_related('user').order_by('-created', '-id')
+    if cursor:
+        verified_name_qs = verified_name_qs.filter(
+            Q(created__lt=created) | Q(created=created, id__lt=verified_name_id)
+        )
+
+    # fetch one extra VerifiedName to find out whether there is a next page
+    verified_names = list(verified_name_qs[:page_size + 1])
+    next_cursor = None
+    if len(verified_names) > page_size:
+        verified_names = verified_names[:page_size]
+        next_cursor = _encode_history_cursor(verified_names[-1])
+
+    return verified_names, next_cursor
 
 
 def update_verification_attempt_id(user, verification_attempt_id):
@@ -141,7 +268,8 @@ def update_verification_attempt_id(user, verification_attempt_id):
         * `user` (User object)
         * `verification_attempt_id` (int)
     """
-    verified_name_obj = get_verified_name(user)
+    # read from the database rather than the cache, since the object is modified and saved
+    verified_name_obj = _get_latest_verified_name(user)
 
     if not verified_name_obj:
         err_msg = (
@@ -218,7 +346,7 @@ def update_verified_name_status(
         )
         raise VerifiedNameAttemptIdNotGiven(err_msg)
 
-    verified_name_obj = VerifiedName.objects.filter(**filters).order_by('-created').first()
+    verified_name_obj = VerifiedName.objects.filter(**filters).order_by('-created', '-id').first()
 
     if not verified_name_obj:
         err_msg = (
@@ -250,6 +378,92 @@ def update_verified_name_status(
     return verified_name_obj
 
 
+def transition_verified_name_status(verified_names, status, verification_attempt_ids=None):
+    """
+    Transition the given VerifiedNames to a new status, following the lifecycle of verified names.
+
+    Only the VerifiedNames whose current status is one of the allowed predecessors of the new status
+    are transitioned. Any other VerifiedName, such as an approved one receiving an out of order "submitted"
+    update, keeps its status.
+
+    VerifiedNames may also be linked to an IDV attempt by the same UPDATE, if they are not linked to one
+    yet. A VerifiedName that is linked changes whether or not its status does.
+
+    The VerifiedNames to change are first read with SELECT ... FOR UPDATE, then changed with a single
+    UPDATE. The locked read is needed because the history records and VERIFIED_NAME_APPROVED payloads
+    must describe exactly the rows the UPDATE changed, and an UPDATE cannot return its rows on every
+    supported database, MySQL included. The locks keep concurrent transitions from changing those rows
+    in between, and are only held on the candidate rows until the transaction ends.
+
+    The history of the VerifiedNames that changed is recorded, and VERIFIED_NAME_APPROVED is sent for
+    each of those that were transitioned once the transaction commits if the new status is approved.
+
+    Arguments:
+        * verified_names (QuerySet of VerifiedName)
+        * status (Verified Name Status)
+        * verification_attempt_ids (dict): Maps the ids of VerifiedNames to the id of the IDV attempt
+          to link them to.
+
+    Returns the number of VerifiedNames that changed.
+    """
+    predecessors = VerifiedNameStatus.allowed_predecessors(status)
+    verification_attempt_ids = verification_attempt_ids or {}
+    is_changed = Q(status__in=predecessors) | Q(
+        id__in=verification_attempt_ids, verification_attempt_id__isnull=True,
+    )
+    with transaction.atomic():
+        # the rows are locked so that exactly these are changed by the conditional UPDATE
+        changed_verified_names = list(verified_names.select_for_update().filter(is_changed))
+        if not changed_verified_names:
+            return 0
+
+        modified = timezone.now()
+        changes = {
+            'status': Case(
+                When(status__in=predecessors, then=Value(VerifiedNameStatus(status).value)), default=F('status'),
+            ),
+            'modified': modified,
+        }
+        linked_ids = [
+            verified_name.id for verified_name in changed_verified_names
+            if verified_name.id in verification_attempt_ids and verified_name.verification_attempt_id is None
+        ]
+        if linked_ids:
+            changes['verification_attempt_id'] = Case(
+                *[
+                    When(id=verified_name_id, then=Value(verification_attempt_ids[verified_name_id]))
+                    for verified_name_id in linked_ids
+                ],
+                default=F('verification_attempt_id'),
+                output_field=VerifiedName._meta.get_field('verification_attempt_id'),
+            )
+        num_changed = VerifiedName.objects.filter(
+            is_changed, id__in=[verified_name.id for verified_name in changed_verified_names],
+        ).update(**changes)
+
+        transitioned_verified_names = []
+        for verified_name in changed_verified_names:
+            if verified_name.status in predecessors:
+                verified_name.status = status
+                transitioned_verified_names.append(verified_name)
+            if verified_name.id in linked_ids:
+                verified_name.verification_attempt_id = verification_attempt_ids[verified_name.id]
+            verified_name.modified = modified
+        VerifiedName.history.bulk_history_create(  # pylint: disable=no-member
+            changed_verified_names, update=True, default_date=modified,
+        )
+
+    # update() does not send post_save, so its side effects are handled here
+    for user_id in {verified_name.user_id for verified_name in changed_verified_names}:
+        invalidate_user_cache(user_id)
+
+    if status == VerifiedNameStatus.APPROVED:
+        for verified_name in transitioned_verified_names:
+            send_verified_name_approved(verified_name.user_id, verified_name.profile_name)
+
+    return num_changed
+
+
 def create_verified_name_config(user, use_verified_name_for_certs=None):
     """
     Create verified name configuration for the given user.
@@ -286,6 +500,186 @@ def should_use_verified_name_for_certs(user):
     name over their profile name for certificates.
     Arguments:
         * `user` (User object)
+
+    The result is cached per user, and invalidated whenever a new config is created for the user.
+    """
+    def _should_use_verified_name_for_certs():
+        config_obj = VerifiedNameConfig.current(user)
+        return config_obj.use_verified_name_for_certs
+
+    return get_or_set_user_value(user.id, 'use_verified_name_for_certs', _should_use_verified_name_for_certs)
+
+
+def get_verified_name_configs(users):
+    """
+    Get the current verified name configuration of many users.
+
+    This is the bulk counterpart to `VerifiedNameConfig.current`. The most recent config of every
+    user in a chunk of `BULK_QUERY_CHUNK_SIZE` users is selected by a single query, and the
+    configuration cache used by `VerifiedNameConfig.current` is warmed with the results, so that
+    later per-user lookups do not need to query the database either.
+
+    Arguments:
+        * `users` (iterable of User objects)
+
+    Returns a dict mapping user_id to VerifiedNameConfig object. As with `VerifiedNameConfig.current`,
+    users without a config are given a new, unsaved config with the default values.
     """
-    config_obj = VerifiedNameConfig.current(user)
-    return config_obj.use_verified_name_for_certs
+    users_by_id = {user.id: user for user in users}
+    latest_config_id = VerifiedNameConfig.objects.filter(
+        user_id=OuterRef('user_id'),
+    ).order_by('-change_date', '-id').values('id')[:1]
+
+    configs = {}
+    for user_id_chunk in _chunked(users_by_id, BULK_QUERY_CHUNK_SIZE):
+        config_qs = VerifiedNameConfig.objects.filter(user_id__in=user_id_chunk, id=Subquery(latest_config_id))
+        configs.update((config.user_id, config) for config in config_qs)
+
+    configs_to_cache = {}
+    for user_id, user in users_by_id.items():
+        config = configs.setdefault(user_id, VerifiedNameConfig(user=user))
+        config.user = user
+        configs_to_cache[VerifiedNameConfig.cache_key_name(user)] = config
+
+    # both tiers read by `VerifiedNameConfig.current` are warmed, with a single round trip to the django cache
+    for cache_key, config in configs_to_cache.items():
+        DEFAULT_REQUEST_CACHE.set(cache_key, config)
+    cache.set_many(configs_to_cache, VerifiedNameConfig.cache_timeout)
+
+    return configs
+
+
+def get_certificate_name(user):
+    """
+    Get the name that should be displayed on the given user's certificates, if it is a verified name.
+
+    Arguments:
+        * `user` (User object)
+
+    Returns the user's most recent approved verified name if they have opted to use their verified
+    name for certificates, otherwise None, in which case their profile name should be used.
+    """
+    if not should_use_verified_name_for_certs(user):
+        return None
+
+    verified_name_obj = get_verified_name(user, is_verified=True)
+    return verified_name_obj.verified_name if verified_name_obj else None
+
+
+def get_certificate_names(user_ids):
+    """
+    Get the names that should be displayed on the certificates of many users, if they are verified names.
+
+    This is the bulk counterpart to `get_certificate_name`. The config and the most recent approved
+    VerifiedName of every user in a chunk of `BULK_QUERY_CHUNK_SIZE` users are resolved together by
+    a single query.
+
+    Arguments:
+        * `user_ids` (iterable of int)
+
+    Returns a dict mapping user_id to verified name, for the users who have opted to use their
+    verified name for certificates and have an approved verified name. The profile name should
+    be used for any other user.
+    """
+    latest_approved_verified_name_id = VerifiedName.objects.filter(
+        user_id=OuterRef('user_id'), status=VerifiedNameStatus.APPROVED.value,
+    ).order_by('-created', '-id').values('id')[:1]
+
+    certificate_names = {}
+    for user_id_chunk in _chunked(user_ids, BULK_QUERY_CHUNK_SIZE):
+        verified_name_qs = VerifiedName.objects.filter(
+            user_id__in=user_id_chunk,
+            id=Subquery(latest_approved_verified_name_id),
+        ).annotate(
+            use_verified_name_for_certs=_latest_verified_name_config_subquery(OuterRef('user_id')),
+        ).filter(use_verified_name_for_certs=True)
+        certificate_names.update(verified_name_qs.values_list('user_id', 'verified_name'))
+
+    return certificate_names
+
+
+def _get_latest_verified_name(user, is_verified=False, statuses_to_exclude=None):
+    """
+    Get the most recent VerifiedName for a given user from the database, bypassing the cache.
+    """
+    verified_name_qs = _filter_verified_names(
+        VerifiedName.objects.filter(user=user), is_verified, statuses_to_exclude,
+    )
+    # the user is cached along with the VerifiedName, so that serializing a cached VerifiedName runs no query
+    return verified_name_qs.select_related('user').order_by('-created', '-id').first()
+
+
+def _has_verified_names(user):
+    """
+    Return whether the given user has any VerifiedName, from the database.
+    """
+    return VerifiedName.objects.filter(user=user).exists()
+
+
+def _may_have_verified_names(user):
+    """
+    Return False if the user is known from the cache to have no VerifiedName, otherwise True.
+    """
+    _, cached_values = get_user_values(user.id, [HAS_VERIFIED_NAMES])
+    return cached_values.get(HAS_VERIFIED_NAMES) is not False
+
+
+def _filter_verified_names(verified_name_qs, is_verified=False, statuses_to_exclude=None):
+    """
+    Apply the `is_verified` and `statuses_to_exclude` filters shared by the VerifiedName lookups.
+    """
+    if is_verified:
+        return verified_name_qs.filter(status=VerifiedNameStatus.APPROVED.value)
+
+    if statuses_to_exclude:
+        return verified_name_qs.exclude(status__in=statuses_to_exclude)
+
+    return verified_name_qs
+
+
+def _chunked(values, chunk_size):
+    """
+    Yield lists of at most `chunk_size` distinct values, preserving order.
+    """
+    values = list(dict.fromkeys(values))
+    for index in range(0, len(values), chunk_size):
+        yield values[index:index + chunk_size]
+
+
+def _encode_history_cursor(verified_name):
+    """
+    Encode the position of a VerifiedName in its user's history as an opaque cursor.
+    """
+    position = f'{verified_name.created.isoformat()}|{verified_name.id}'
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+
+def _decode_history_cursor(cursor):
+    """
+    Decode a cursor into the (created, id) position it was encoded from.
+    """
+    try:
+        created, verified_name_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        created = parse_datetime(created)
+        verified_name_id = int(verified_name_id)
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise VerifiedNameHistoryInvalidCursor(f'Invalid verified name history cursor={cursor}') from exc
+
+    if created is None:
+        raise VerifiedNameHistoryInvalidCursor(f'Invalid verified name history cursor={cursor}')
+
+    return created, verified_name_id
+
+
+def _latest_verified_name_config_subquery(user_id):
+    """
+    Return a subquery selecting the current `use_verified_name_for_certs` value of the given user.
+
+    Arguments:
+        * `user_id` (OuterRef): Reference to the user id in the outer query.
+    """
+    return Subquery(
+        VerifiedNameConfig.objects.filter(user_id=user_id).order_by('-change_date').values(
+            'use_verified_name_for_certs'
+        )[:1]
+    )
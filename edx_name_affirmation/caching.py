@@ -0,0 +1,184 @@
+"""
+Caching for edx_name_affirmation lookups.
+
+Every cached value belonging to a user is stored under that user's current cache version.
+Invalidating a user replaces the version, which makes all of the values cached for them
+unreachable at once, whatever lookup variant they were cached for.
+"""
+
+import hashlib
+import uuid
+from threading import local
+from weakref import WeakSet
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_KEY_PREFIX = 'edx_name_affirmation'
+
+# Number of seconds values are cached for, unless overridden by the VERIFIED_NAME_CACHE_TIMEOUT setting
+DEFAULT_CACHE_TIMEOUT = 60 * 60
+
+# Number of seconds that the fact that a user has no VerifiedNames is cached for, unless overridden by
+# the VERIFIED_NAME_NEGATIVE_CACHE_TIMEOUT setting. Most users never have a VerifiedName, and the fact
+# is invalidated as soon as one is created, so it is kept for longer than other values.
+DEFAULT_NEGATIVE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Name of the cached value recording whether a user has any VerifiedNames
+HAS_VERIFIED_NAMES = 'has_verified_names'
+
+# Invalidations made within the current transaction of this thread, which have not been committed yet.
+# Invalidations are only referenced by the transaction's on-commit callbacks, so an invalidation is
+# dropped from here as soon as the transaction is rolled back.
+_transaction_invalidations = local()
+
+
+def get_cache_timeout():
+    """
+    Return the number of seconds that cached values should be kept for.
+    """
+    return getattr(settings, 'VERIFIED_NAME_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT)
+
+
+def get_negative_cache_timeout():
+    """
+    Return the number of seconds that the fact that a user has no VerifiedNames should be kept for.
+    """
+    return getattr(settings, 'VERIFIED_NAME_NEGATIVE_CACHE_TIMEOUT', DEFAULT_NEGATIVE_CACHE_TIMEOUT)
+
+
+def is_response_cache_enabled():
+    """
+    Return whether the responses of the verified name GET endpoints should be cached, as set by the
+    VERIFIED_NAME_CACHE_RESPONSES setting.
+    """
+    return getattr(settings, 'VERIFIED_NAME_CACHE_RESPONSES', False)
+
+
+def get_user_cache_version(user_id):
+    """
+    Return the current cache version for the given user, creating one if needed.
+    """
+    version_key = _get_version_key(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # the version must outlive every value cached under it, so it does not expire
+        if not cache.add(version_key, version, None):
+            # another process created a version first, so use theirs
+            version = cache.get(version_key, version)
+    return version
+
+
+def get_user_values(user_id, names):
+    """
+    Return the values cached for the given user under any of the given names.
+
+    Returns a tuple of the user's cache version, which must be passed to `set_user_values` when
+    caching values computed after this call, and a dict mapping names to their cached values.
+    Names without a cached value are left out of the dict.
+    """
+    version = get_user_cache_version(user_id)
+    value_keys = {_get_value_key(user_id, version, name): name for name in names}
+    cached_values = cache.get_many(list(value_keys))
+    # values are wrapped so that a cached None can be told apart from a cache miss
+    return version, {value_keys[value_key]: value[0] for value_key, value in cached_values.items()}
+
+
+def set_user_values(user_id, version, values):
+    """
+    Cache the given values for the user, under the cache version returned by `get_user_values`.
+
+    If the user's cache was invalidated since the version was read, the values may be stale and
+    are cached under the old version, where they can no longer be found.
+
+    The values are not cached if the user's cache was invalidated within the current transaction,
+    since they may have been computed from changes which are rolled back.
+    """
+    if transaction.get_connection().in_atomic_block and _is_invalidated_in_transaction(user_id):
+        return
+
+    values_by_timeout = {}
+    for name, value in values.items():
+        timeout = get_negative_cache_timeout() if name == HAS_VERIFIED_NAMES and not value else get_cache_timeout()
+        values_by_timeout.setdefault(timeout, {})[_get_value_key(user_id, version, name)] = (value,)
+
+    for timeout, values_to_set in values_by_timeout.items():
+        cache.set_many(values_to_set, timeout)
+
+
+def get_or_set_user_value(user_id, name, compute_value):
+    """
+    Return the cached value `name` for the given user, calling `compute_value` on a cache miss.
+
+    Arguments:
+        * `user_id` (int)
+        * `name` (str): Identifies the value amongst the values cached for the user.
+        * `compute_value` (callable): Returns the value to cache. The value may be None.
+    """
+    version, cached_values = get_user_values(user_id, [name])
+    if name in cached_values:
+        return cached_values[name]
+
+    value = compute_value()
+    set_user_values(user_id, version, {name: value})
+    return value
+
+
+def invalidate_user_cache(user_id):
+    """
+    Invalidate every value cached for the given user.
+
+    The cache is invalidated immediately, and again once the current transaction commits, so
+    that a value cached from uncommitted data by a concurrent request does not outlive it.
+    """
+    _delete_user_cache_version(user_id)
+    invalidation = _Invalidation(user_id)
+    if transaction.get_connection().in_atomic_block:
+        _get_transaction_invalidations().add(invalidation)
+    transaction.on_commit(invalidation)
+
+
+class _Invalidation:
+    """
+    Invalidation of a user's cache, repeated once the transaction it was made in commits.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.is_committed = False
+
+    def __call__(self):
+        """
+        Invalidate the user's cache again, now that the transaction is committed.
+        """
+        self.is_committed = True
+        _delete_user_cache_version(self.user_id)
+
+
+def _get_transaction_invalidations():
+    if not hasattr(_transaction_invalidations, 'invalidations'):
+        _transaction_invalidations.invalidations = WeakSet()
+    return _transaction_invalidations.invalidations
+
+
+def _is_invalidated_in_transaction(user_id):
+    return any(
+        invalidation.user_id == user_id and not invalidation.is_committed
+        for invalidation in _get_transaction_invalidations()
+    )
+
+
+def _delete_user_cache_version(user_id):
+    cache.delete(_get_version_key(user_id))
+
+
+def _get_version_key(user_id):
+    return f'{CACHE_KEY_PREFIX}.version.{user_id}'
+
+
+def _get_value_key(user_id, version, name):
+    # names may contain characters memcached does not accept in keys, so hash them
+    name_hash = hashlib.md5(name.encode('utf-8')).hexdigest()
+    return f'{CACHE_KEY_PREFIX}.{user_id}.{version}.{name_hash}'
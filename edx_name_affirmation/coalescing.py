@@ -0,0 +1,116 @@
+"""
+Coalescing of rapid IDV attempt status updates.
+
+IDV attempts usually go from created to submitted to approved within seconds. When coalescing is
+enabled, the latest update received for an attempt is kept in the cache and a single delayed task
+applies it, instead of one task running per update.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from edx_name_affirmation.caching import CACHE_KEY_PREFIX
+from edx_name_affirmation.statuses import VerifiedNameStatus
+
+# Number of seconds updates to an IDV attempt are coalesced for, unless overridden by the
+# VERIFIED_NAME_IDV_COALESCE_SECONDS setting. Coalescing is disabled by default.
+DEFAULT_IDV_COALESCE_SECONDS = 0
+
+# Number of seconds the latest update to an IDV attempt is remembered for after it is applied, so
+# that a stale update arriving late is dropped rather than applied
+IDV_UPDATE_TIMEOUT = 24 * 60 * 60
+
+# Updates to an attempt are never replaced by an update of a lower rank, so that a late "submitted"
+# cannot overwrite "approved". Updates of the same rank replace each other. The latest update of each
+# rank is cached under its own key, so that concurrent updates of different ranks cannot overwrite
+# each other and the update of the highest rank is always the one applied.
+IDV_STATUS_RANKS = {
+    VerifiedNameStatus.PENDING: 0,
+    VerifiedNameStatus.SUBMITTED: 1,
+    VerifiedNameStatus.APPROVED: 2,
+    VerifiedNameStatus.DENIED: 2,
+}
+
+
+def get_idv_coalesce_seconds():
+    """
+    Return the number of seconds updates to an IDV attempt are coalesced for, or 0 if coalescing is disabled.
+    """
+    return getattr(settings, 'VERIFIED_NAME_IDV_COALESCE_SECONDS', DEFAULT_IDV_COALESCE_SECONDS)
+
+
+def record_idv_update(attempt_id, user_id, status, photo_id_name, full_name, max_delay_seconds):
+    """
+    Record an update to an IDV attempt, to be applied by a coalesced task.
+
+    `max_delay_seconds` is the longest the task may start after its countdown, such as the longest
+    delay between its retries.
+
+    The update is dropped if an update of a higher rank was already recorded for the attempt. If one is
+    recorded concurrently, both are cached and the update of the higher rank is the one claimed.
+
+    Returns a tuple of whether the update was recorded, and whether a task must be scheduled to
+    apply it. A task only needs to be scheduled if none is already pending for the attempt.
+    """
+    rank = _get_rank(status)
+    if cache.get_many(_get_update_keys(user_id, attempt_id, min_rank=rank + 1)):
+        return False, False
+
+    cache.set(
+        _get_update_key(user_id, attempt_id, rank),
+        {'status': status, 'photo_id_name': photo_id_name, 'full_name': full_name},
+        get_idv_coalesce_seconds() + IDV_UPDATE_TIMEOUT,
+    )
+    # the pending marker outlives the countdown of the task, in case the task starts late, but not by
+    # much, so that an update recorded after a task was lost or never published schedules a new one
+    is_scheduling_needed = cache.add(
+        _get_pending_key(user_id, attempt_id), True, 2 * get_idv_coalesce_seconds() + max_delay_seconds,
+    )
+    return True, is_scheduling_needed
+
+
+def claim_idv_update(attempt_id, user_id):
+    """
+    Return the latest update recorded for an IDV attempt, as a dict of `status`, `photo_id_name` and
+    `full_name`, or None if it is no longer cached.
+
+    The pending task for the attempt is cleared first, so that an update recorded after this call
+    schedules a new task instead of being lost.
+    """
+    release_idv_update(attempt_id, user_id)
+    update_keys = _get_update_keys(user_id, attempt_id)
+    updates = cache.get_many(update_keys)
+    for update_key in reversed(update_keys):
+        if update_key in updates:
+            return updates[update_key]
+    return None
+
+
+def release_idv_update(attempt_id, user_id):
+    """
+    Clear the pending task of an IDV attempt, so that the next update recorded for it schedules a new task.
+    """
+    cache.delete(_get_pending_key(user_id, attempt_id))
+
+
+def _get_rank(status):
+    return IDV_STATUS_RANKS.get(status, 0)
+
+
+def _get_update_key(user_id, attempt_id, rank):
+    return f'{CACHE_KEY_PREFIX}.idv_update.{user_id}.{attempt_id}.{rank}'
+
+
+def _get_update_keys(user_id, attempt_id, min_rank=0):
+    """
+    Return the keys of the updates of the given rank or higher recorded for an attempt, from the lowest rank.
+    """
+    return [
+        _get_update_key(user_id, attempt_id, rank)
+        for rank in sorted(set(IDV_STATUS_RANKS.values()))
+        if rank >= min_rank
+    ]
+
+
+def _get_pending_key(user_id, attempt_id):
+    return f'{CACHE_KEY_PREFIX}.idv_update_pending.{user_id}.{attempt_id}'
@@ -0,0 +1,116 @@
+"""
+Dispatch of name affirmation Celery tasks from signal handlers.
+
+Handlers are usually called inside the transaction that changed the attempt they receive. When
+dispatching on commit is enabled, the tasks triggered within a transaction are collected, and
+published together once the transaction commits, so that workers never run before the data they
+read is visible. Tasks collected within a transaction that is rolled back are never published.
+"""
+
+from threading import local
+from weakref import WeakValueDictionary
+
+from django.conf import settings
+from django.db import transaction
+
+# Batches of tasks waiting for the current transaction of this thread to commit, by the ids of the
+# savepoints they were dispatched in. Batches are only referenced by the transaction's on-commit
+# callbacks, so a batch is dropped from here as soon as it is published or rolled back.
+_transaction_batches = local()
+
+
+def is_dispatch_on_commit_enabled():
+    """
+    Return whether tasks should be published after the current transaction commits, as set by the
+    VERIFIED_NAME_DISPATCH_ON_COMMIT setting.
+    """
+    return getattr(settings, 'VERIFIED_NAME_DISPATCH_ON_COMMIT', False)
+
+
+def call_after_commit(func):
+    """
+    Call `func` once the current transaction commits if dispatching on commit is enabled, or immediately if not.
+    """
+    if is_dispatch_on_commit_enabled():
+        transaction.on_commit(func)
+    else:
+        func()
+
+
+def dispatch_task(task, args, kwargs=None, **options):
+    """
+    Publish a Celery task, either immediately or once the current transaction commits.
+
+    Arguments:
+        * `task` (celery.Task)
+        * `args` (tuple): Positional arguments of the task.
+        * `kwargs` (dict): Keyword arguments of the task.
+        * `options`: Options of `apply_async`, such as `countdown`.
+
+    Identical tasks dispatched within the same transaction are only published once.
+    """
+    if not is_dispatch_on_commit_enabled():
+        if options:
+            task.apply_async(args, kwargs, **options)
+        else:
+            task.delay(*args, **(kwargs or {}))
+        return
+
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        # in autocommit mode the data is already visible
+        _TaskBatch([(task, tuple(args), kwargs or {}, options)]).publish()
+        return
+
+    _get_transaction_batch(connection).add(task, tuple(args), kwargs or {}, options)
+
+
+class _TaskBatch:
+    """
+    Tasks to publish together, using a single connection to the broker.
+    """
+
+    def __init__(self, tasks=None):
+        self.tasks = tasks or []
+        self.is_published = False
+
+    def add(self, task, args, kwargs, options):
+        entry = (task, args, kwargs, options)
+        if entry not in self.tasks:
+            self.tasks.append(entry)
+
+    def publish(self):
+        """
+        Publish the tasks of the batch, over a single producer.
+        """
+        self.is_published = True
+        if not self.tasks:
+            return
+
+        app = self.tasks[0][0].app
+        with app.producer_or_acquire() as producer:
+            for task, args, kwargs, options in self.tasks:
+                task.apply_async(args, kwargs, producer=producer, **options)
+
+    def __call__(self):
+        self.publish()
+
+
+def _get_transaction_batch(connection):
+    """
+    Return the batch of tasks to publish once the connection's current transaction commits.
+
+    Batches are kept per savepoint, so that tasks are discarded along with the savepoint they were
+    dispatched in if it is rolled back, and a discarded or published batch is never added to again.
+    """
+    batches = getattr(_transaction_batches, 'batches', None)
+    if batches is None:
+        batches = _transaction_batches.batches = WeakValueDictionary()
+
+    savepoint_ids = tuple(connection.savepoint_ids)
+    batch = batches.get(savepoint_ids)
+    if batch is None or batch.is_published:
+        batch = _TaskBatch()
+        transaction.on_commit(batch)
+        batches[savepoint_ids] = batch
+    return batch
@@ -42,3 +42,9 @@ class VerifiedNameAttemptIdNotGiven(Exception):
     Neither a verification_attempt_id or a proctored_exam_attempt_id was given for a
     function that requires it.
     """
+
+
+class VerifiedNameHistoryInvalidCursor(Exception):
+    """
+    The cursor given to page through a user's VerifiedName history could not be decoded.
+    """
@@ -5,13 +5,18 @@ Name Affirmation signal handlers
 import logging
 
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch.dispatcher import receiver
 
-from edx_name_affirmation.models import VerifiedName
-from edx_name_affirmation.signals import VERIFIED_NAME_APPROVED
+from edx_name_affirmation.caching import invalidate_user_cache
+from edx_name_affirmation.coalescing import get_idv_coalesce_seconds, record_idv_update, release_idv_update
+from edx_name_affirmation.dispatch import call_after_commit, dispatch_task
+from edx_name_affirmation.models import VerifiedName, VerifiedNameConfig
+from edx_name_affirmation.name_resolution import is_minimal_payload_enabled
+from edx_name_affirmation.signals import send_verified_name_approved
 from edx_name_affirmation.statuses import VerifiedNameStatus
 from edx_name_affirmation.tasks import (
+    bulk_proctoring_update_verified_names_task,
     delete_verified_name_task,
     idv_update_verified_name_task,
     proctoring_update_verified_name_task
@@ -25,14 +30,27 @@ log = logging.getLogger(__name__)
 @receiver(post_save, sender=VerifiedName)
 def verified_name_approved(sender, instance, **kwargs):  # pylint: disable=unused-argument
     """
-    Emit a signal when a verified name's status is updated to "approved".
+    Emit a signal when a verified name's status is updated to "approved", once it is committed.
     """
     if instance.status == VerifiedNameStatus.APPROVED:
-        VERIFIED_NAME_APPROVED.send(
-          sender='name_affirmation',
-          user_id=instance.user.id,
-          profile_name=instance.profile_name
-        )
+        send_verified_name_approved(instance.user_id, instance.profile_name)
+
+
+@receiver(post_save, sender=VerifiedName)
+@receiver(post_delete, sender=VerifiedName)
+def invalidate_verified_name_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate cached lookups for the user whenever one of their verified names changes.
+    """
+    invalidate_user_cache(instance.user_id)
+
+
+@receiver(post_save, sender=VerifiedNameConfig)
+def invalidate_verified_name_config_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate cached lookups for the user whenever a new verified name config is created for them.
+    """
+    invalidate_user_cache(instance.user_id)
 
 
 def idv_attempt_handler(attempt_id, user_id, status, photo_id_name, full_name, **kwargs):
@@ -46,10 +64,17 @@ def idv_attempt_handler(attempt_id, user_id, status, photo_id_name, full_name, *
         photo_id_name(str): name to be used as verified name
         full_name(str): user's pending name change or current profile name
     """
+    # the status of the attempt is shown in the user's verified name history, even when no VerifiedName changes
+    invalidate_user_cache(user_id)
+
     trigger_status = VerifiedNameStatus.trigger_state_change_from_idv(status)
 
     # only trigger celery task if status is relevant to name affirmation
     if trigger_status:
+        if is_minimal_payload_enabled():
+            # the task resolves the names from the attempt and the user, so they are not sent
+            photo_id_name, full_name = None, None
+
         log.info('VerifiedName: idv_attempt_handler triggering Celery task for user %(user_id)s '
                  'with photo_id_name %(photo_id_name)s and status %(status)s',
                  {
@@ -58,7 +83,16 @@ def idv_attempt_handler(attempt_id, user_id, status, photo_id_name, full_name, *
                      'status': status
                  }
                  )
-        idv_update_verified_name_task.delay(attempt_id, user_id, trigger_status, photo_id_name, full_name)
+        coalesce_seconds = get_idv_coalesce_seconds()
+        if coalesce_seconds:
+            # the update is recorded once it is visible, so that a rollback cannot leave it recorded as pending
+            call_after_commit(lambda: _coalesce_idv_update(
+                attempt_id, user_id, trigger_status, photo_id_name, full_name, coalesce_seconds,
+            ))
+        else:
+            dispatch_task(
+                idv_update_verified_name_task, (attempt_id, user_id, trigger_status, photo_id_name, full_name),
+            )
     else:
         log.info('VerifiedName: idv_attempt_handler will not trigger Celery task for user %(user_id)s '
                  'with photo_id_name %(photo_id_name)s because of status %(status)s',
@@ -70,6 +104,37 @@ def idv_attempt_handler(attempt_id, user_id, status, photo_id_name, full_name, *
                  )
 
 
+def _coalesce_idv_update(attempt_id, user_id, status, photo_id_name, full_name, coalesce_seconds):
+    """
+    Record an IDV attempt update, and schedule a task to apply the latest update to the attempt
+    once the coalescing window has passed, unless one is already scheduled.
+    """
+    is_recorded, is_scheduling_needed = record_idv_update(
+        attempt_id, user_id, status, photo_id_name, full_name, idv_update_verified_name_task.retry_backoff_max,
+    )
+    if not is_recorded:
+        log.info('VerifiedName: idv_attempt_handler dropped status %(status)s for user %(user_id)s '
+                 'and attempt_id %(attempt_id)s because a later status was already received',
+                 {
+                     'user_id': user_id,
+                     'attempt_id': attempt_id,
+                     'status': status
+                 }
+                 )
+    elif is_scheduling_needed:
+        try:
+            dispatch_task(
+                idv_update_verified_name_task,
+                (attempt_id, user_id, status, photo_id_name, full_name),
+                {'coalesced': True},
+                countdown=coalesce_seconds,
+            )
+        except Exception:
+            # no task is pending after all, so the next update must schedule one
+            release_idv_update(attempt_id, user_id)
+            raise
+
+
 def idv_delete_handler(sender, instance, signal, **kwargs):  # pylint: disable=unused-argument
     """
     Receiver for IDV attempt deletions
@@ -84,7 +149,7 @@ def idv_delete_handler(sender, instance, signal, **kwargs):  # pylint: disable=u
             'idv_attempt_id': idv_attempt_id,
         }
     )
-    delete_verified_name_task.delay(idv_attempt_id, None)
+    dispatch_task(delete_verified_name_task, (idv_attempt_id, None))
 
 
 def proctoring_attempt_handler(
@@ -112,24 +177,20 @@ def proctoring_attempt_handler(
         backend_supports_onboarding(boolean): if the exam attempt is for an exam with a backend that supports onboarding
     """
 
-    # We only care about updates from onboarding exams, or from non-practice proctored exams with a backend that
-    # does not support onboarding. This is because those two event types are guaranteed to contain verification events,
-    # whereas timed exams and proctored exams with a backend that does support onboarding are not guaranteed
-    is_onboarding_exam = is_practice_exam and is_proctored and backend_supports_onboarding
-    reviewable_proctored_exam = is_proctored and not is_practice_exam and not backend_supports_onboarding
-    if not (is_onboarding_exam or reviewable_proctored_exam):
+    if not _is_verifying_exam(is_practice_exam, is_proctored, backend_supports_onboarding):
         return
 
     trigger_status = VerifiedNameStatus.trigger_state_change_from_proctoring(status)
 
     # only trigger celery task if status is relevant to name affirmation
     if trigger_status:
-        proctoring_update_verified_name_task.delay(
-            attempt_id,
-            user_id,
-            trigger_status,
-            full_name,
-            profile_name,
+        if is_minimal_payload_enabled():
+            # the task resolves the names from the user, so they are not sent
+            full_name, profile_name = None, None
+
+        dispatch_task(
+            proctoring_update_verified_name_task,
+            (attempt_id, user_id, trigger_status, full_name, profile_name),
         )
     else:
         log.info('VerifiedName: proctoring_attempt_handler will not trigger Celery task for user %(user_id)s '
@@ -142,6 +203,57 @@ def proctoring_attempt_handler(
                  )
 
 
+def proctoring_attempts_handler(attempts, **kwargs):
+    """
+    Receiver for a batch of proctored exam attempt updates, such as the results of a review batch.
+
+    Args:
+        attempts(list): for each attempt, a dict of the arguments received by proctoring_attempt_handler
+    """
+    updates = []
+    for attempt in attempts:
+        if not _is_verifying_exam(
+            attempt['is_practice_exam'], attempt['is_proctored'], attempt['backend_supports_onboarding'],
+        ):
+            continue
+
+        trigger_status = VerifiedNameStatus.trigger_state_change_from_proctoring(attempt['status'])
+        if trigger_status:
+            if is_minimal_payload_enabled():
+                updates.append((attempt['attempt_id'], attempt['user_id'], trigger_status, None, None))
+            else:
+                updates.append((
+                    attempt['attempt_id'],
+                    attempt['user_id'],
+                    trigger_status,
+                    attempt['full_name'],
+                    attempt['profile_name'],
+                ))
+
+    log.info(
+        'VerifiedName: proctoring_attempts_handler triggering Celery task for %(num_updates)s of '
+        '%(num_attempts)s attempts',
+        {
+            'num_updates': len(updates),
+            'num_attempts': len(attempts),
+        }
+    )
+    if updates:
+        dispatch_task(bulk_proctoring_update_verified_names_task, (updates,))
+
+
+def _is_verifying_exam(is_practice_exam, is_proctored, backend_supports_onboarding):
+    """
+    Return whether updates of the exam's attempts are relevant to name affirmation
+    """
+    # We only care about updates from onboarding exams, or from non-practice proctored exams with a backend that
+    # does not support onboarding. This is because those two event types are guaranteed to contain verification events,
+    # whereas timed exams and proctored exams with a backend that does support onboarding are not guaranteed
+    is_onboarding_exam = is_practice_exam and is_proctored and backend_supports_onboarding
+    reviewable_proctored_exam = is_proctored and not is_practice_exam and not backend_supports_onboarding
+    return bool(is_onboarding_exam or reviewable_proctored_exam)
+
+
 def proctoring_delete_handler(sender, instance, signal, **kwargs):  # pylint: disable=unused-argument
     """
     Receiver for proctoring attempt deletions
@@ -157,4 +269,4 @@ def proctoring_delete_handler(sender, instance, signal, **kwargs):  # pylint: di
             'proctoring_attempt_id': proctoring_attempt_id,
         }
     )
-    delete_verified_name_task.delay(None, proctoring_attempt_id)
+    dispatch_task(delete_verified_name_task, (None, proctoring_attempt_id))
@@ -0,0 +1,80 @@
+"""
+Duplicate suppression for name affirmation tasks.
+
+Tasks are retried on failure and delivered at least once, so the same attempt event may be processed
+several times. The status last applied for each attempt is recorded in the cache once a task succeeds,
+so that a replay of that event is skipped before touching any VerifiedName.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from edx_name_affirmation.caching import CACHE_KEY_PREFIX
+
+# Number of seconds that processed events are remembered for, unless overridden by the
+# VERIFIED_NAME_TASK_EVENT_TIMEOUT setting. A timeout of 0 disables duplicate suppression.
+DEFAULT_TASK_EVENT_TIMEOUT = 24 * 60 * 60
+
+
+def get_task_event_timeout():
+    """
+    Return the number of seconds that processed events should be remembered for.
+    """
+    return getattr(settings, 'VERIFIED_NAME_TASK_EVENT_TIMEOUT', DEFAULT_TASK_EVENT_TIMEOUT)
+
+
+def is_event_processed(task_name, attempt_id, status):
+    """
+    Return whether the given status was the last one applied by the task for the attempt.
+    """
+    if not get_task_event_timeout() or attempt_id is None:
+        return False
+    return cache.get(_get_event_key(task_name, attempt_id)) == status
+
+
+def mark_event_processed(task_name, attempt_id, status):
+    """
+    Record that the task applied the given status for the attempt, once the current transaction commits.
+    """
+    if not get_task_event_timeout() or attempt_id is None:
+        return
+    # an event whose changes are rolled back must be processed again
+    transaction.on_commit(
+        lambda: cache.set(_get_event_key(task_name, attempt_id), status, get_task_event_timeout())
+    )
+
+
+def get_processed_statuses(task_name, attempt_ids):
+    """
+    Return a dict mapping the given attempt ids to the status last applied by the task for them.
+
+    Attempts for which no status is recorded are left out of the dict.
+    """
+    if not get_task_event_timeout():
+        return {}
+    event_keys = {_get_event_key(task_name, attempt_id): attempt_id for attempt_id in attempt_ids}
+    return {event_keys[event_key]: status for event_key, status in cache.get_many(list(event_keys)).items()}
+
+
+def mark_events_processed(task_name, statuses_by_attempt_id):
+    """
+    Record that the task applied the given statuses, keyed by attempt id, once the current transaction commits.
+    """
+    if not get_task_event_timeout() or not statuses_by_attempt_id:
+        return
+    transaction.on_commit(lambda: cache.set_many(
+        {_get_event_key(task_name, attempt_id): status for attempt_id, status in statuses_by_attempt_id.items()},
+        get_task_event_timeout(),
+    ))
+
+
+def clear_processed_events(task_name, attempt_id):
+    """
+    Forget the status applied by the task for the attempt, so that the next event for it is processed.
+    """
+    cache.delete(_get_event_key(task_name, attempt_id))
+
+
+def _get_event_key(task_name, attempt_id):
+    return f'{CACHE_KEY_PREFIX}.task_event.{task_name}.{attempt_id}'
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_name_affirmation', '0009_verifiedname_user_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='verifiedname',
+            index=models.Index(fields=['verification_attempt_id'], name='nameaff_vn_idv_attempt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verifiedname',
+            index=models.Index(fields=['proctored_exam_attempt_id'], name='nameaff_vn_exam_attempt_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_name_affirmation', '0010_verifiedname_attempt_id_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerifiedNameUserLock',
+            fields=[
+                ('user_id', models.IntegerField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'verbose_name': 'verified name user lock',
+                'db_table': 'nameaffirmation_verifiednameuserlock',
+            },
+        ),
+    ]
@@ -50,11 +50,22 @@ class VerifiedName(TimeStampedModel):
         """ Meta class for this Django model """
         db_table = 'nameaffirmation_verifiedname'
         verbose_name = 'verified name'
+        indexes = [
+            # Support looking up a user's most recent VerifiedName, optionally with a given status
+            models.Index(fields=['user', 'created'], name='nameaff_vn_user_created_idx'),
+            models.Index(fields=['user', 'status', 'created'], name='nameaff_vn_user_status_idx'),
+            # Support finding the VerifiedNames linked to an external attempt, without a user
+            models.Index(fields=['verification_attempt_id'], name='nameaff_vn_idv_attempt_idx'),
+            models.Index(fields=['proctored_exam_attempt_id'], name='nameaff_vn_exam_attempt_idx'),
+        ]
 
     @property
     def verification_attempt_status(self):
         "Returns the status associated with its SoftwareSecurePhotoVerification with verification_attempt_id if any."
 
+        if hasattr(self, '_verification_attempt_status'):
+            return self._verification_attempt_status
+
         if not self.verification_attempt_id or not SoftwareSecurePhotoVerification:
             return None
 
@@ -65,6 +76,36 @@ class VerifiedName(TimeStampedModel):
         except ObjectDoesNotExist:
             return None
 
+    @classmethod
+    def prefetch_verification_attempt_statuses(cls, verified_names):
+        """
+        Resolve `verification_attempt_status` for all of the given VerifiedNames with a single query,
+        rather than one query per VerifiedName.
+
+        Returns the VerifiedNames as a list.
+        """
+        verified_names = list(verified_names)
+        attempt_statuses = cls.get_verification_attempt_statuses(
+            verified_name.verification_attempt_id for verified_name in verified_names
+        )
+
+        for verified_name in verified_names:
+            # pylint: disable=protected-access
+            verified_name._verification_attempt_status = attempt_statuses.get(verified_name.verification_attempt_id)
+
+        return verified_names
+
+    @staticmethod
+    def get_verification_attempt_statuses(verification_attempt_ids):
+        """
+        Return a dict mapping the given verification attempt ids to the status of their
+        SoftwareSecurePhotoVerification, with a single query. Attempts that do not exist are left out.
+        """
+        attempt_ids = {attempt_id for attempt_id in verification_attempt_ids if attempt_id}
+        if not attempt_ids or not SoftwareSecurePhotoVerification:
+            return {}
+        return dict(SoftwareSecurePhotoVerification.objects.filter(id__in=attempt_ids).values_list('id', 'status'))
+
 
 class VerifiedNameConfig(ConfigurationModel):
     """
@@ -81,3 +122,22 @@ class VerifiedNameConfig(ConfigurationModel):
         """ Meta class for this Django model """
         db_table = 'nameaffirmation_verifiednameconfig'
         verbose_name = 'verified name config'
+
+
+class VerifiedNameUserLock(models.Model):
+    """
+    This model provides a row per user, which tasks changing the user's VerifiedNames lock until their
+    transaction ends, so that the tasks of the same user run one after the other.
+
+    The user's own row is not locked instead, since it belongs to the LMS, which writes it often, for
+    instance on every login, and must never wait for these tasks. The user is not a foreign key, so
+    that these rows do not have to be deleted along with users either.
+
+    .. no_pii: This model has no PII.
+    """
+    user_id = models.IntegerField(primary_key=True)
+
+    class Meta:
+        """ Meta class for this Django model """
+        db_table = 'nameaffirmation_verifiednameuserlock'
+        verbose_name = 'verified name user lock'
@@ -0,0 +1,110 @@
+"""
+Resolution of the names of attempt updates from the LMS models they originate from.
+
+When minimal task payloads are enabled, handlers send tasks attempt and user ids only, rather than
+names, and the tasks resolve the names when they run, in bulk for the bulk tasks. Names are
+resolved as they are when the task runs, rather than when the update was received.
+"""
+
+from django.conf import settings
+
+try:
+    from common.djangoapps.student.models import PendingNameChange, UserProfile
+    from lms.djangoapps.verify_student.models import SoftwareSecurePhotoVerification
+except ImportError:
+    PendingNameChange = None
+    UserProfile = None
+    SoftwareSecurePhotoVerification = None
+
+
+def is_minimal_payload_enabled():
+    """
+    Return whether handlers should leave names out of task payloads, as set by the
+    VERIFIED_NAME_MINIMAL_TASK_PAYLOADS setting. Names can only be left out if the LMS models
+    they are resolved from are installed.
+    """
+    return bool(
+        getattr(settings, 'VERIFIED_NAME_MINIMAL_TASK_PAYLOADS', False)
+        and UserProfile and SoftwareSecurePhotoVerification
+    )
+
+
+def get_photo_id_names(verification_attempt_ids):
+    """
+    Return a dict mapping the given IDV attempt ids to the name on the photo ID of the attempt.
+    """
+    if not SoftwareSecurePhotoVerification:
+        return {}
+    return dict(
+        SoftwareSecurePhotoVerification.objects.filter(
+            id__in=set(verification_attempt_ids),
+        ).values_list('id', 'name')
+    )
+
+
+def get_profile_names(user_ids):
+    """
+    Return a dict mapping the given user ids to the name on the user's profile.
+    """
+    if not UserProfile:
+        return {}
+    return dict(UserProfile.objects.filter(user_id__in=set(user_ids)).values_list('user_id', 'name'))
+
+
+def get_full_names(user_ids):
+    """
+    Return a dict mapping the given user ids to the user's pending name change if any, or else the
+    name on the user's profile.
+    """
+    user_ids = set(user_ids)
+    full_names = get_profile_names(user_ids)
+    if PendingNameChange:
+        full_names.update(
+            PendingNameChange.objects.filter(user_id__in=user_ids).values_list('user_id', 'new_name')
+        )
+    return full_names
+
+
+def resolve_idv_update_names(updates):
+    """
+    Return the given IDV attempt updates, with the names they were sent without resolved.
+
+    Each update is a tuple of (attempt_id, user_id, status, photo_id_name, full_name). The names
+    of all the updates are resolved with a fixed number of queries.
+    """
+    updates = [tuple(update) for update in updates]
+    photo_id_names = get_photo_id_names(update[0] for update in updates if update[3] is None)
+    full_names = get_full_names(update[1] for update in updates if update[4] is None)
+    return [
+        (
+            attempt_id,
+            user_id,
+            status,
+            photo_id_names.get(attempt_id) if photo_id_name is None else photo_id_name,
+            full_names.get(user_id) if full_name is None else full_name,
+        )
+        for attempt_id, user_id, status, photo_id_name, full_name in updates
+    ]
+
+
+def resolve_proctoring_update_names(updates):
+    """
+    Return the given proctoring attempt updates, with the names they were sent without resolved.
+
+    Each update is a tuple of (attempt_id, user_id, status, full_name, profile_name). Both names
+    are resolved to the name on the user's profile, with a single query for all the updates.
+    """
+    updates = [tuple(update) for update in updates]
+    profile_names = get_profile_names(
+        update[1] for update in updates if update[3] is None or update[4] is None
+    )
+    return [
+        (
+            attempt_id,
+            user_id,
+            status,
+            profile_names.get(user_id) if full_name is None else full_name,
+            profile_names.get(user_id) if profile_name is None else profile_name,
+        )
+        for attempt_id, user_id, status, full_name, profile_name in updates
+    ]
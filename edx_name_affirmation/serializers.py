@@ -4,12 +4,17 @@ import re
 
 from rest_framework import serializers
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import F
 
 from edx_name_affirmation.models import VerifiedName, VerifiedNameConfig
 
 User = get_user_model()
 
+# Maximum number of users in a bulk request, unless overridden by the VERIFIED_NAME_BULK_MAX_USERS setting
+DEFAULT_BULK_MAX_USERS = 500
+
 
 class VerifiedNameSerializer(serializers.ModelSerializer):
     """
@@ -55,6 +60,38 @@ class VerifiedNameSerializer(serializers.ModelSerializer):
         return bool(regex)
 
 
+def serialize_verified_names(verified_name_qs):
+    """
+    Return the same data as `VerifiedNameSerializer(verified_names, many=True).data` for the
+    VerifiedNames of the given QuerySet, without instantiating any model or DRF field per VerifiedName.
+
+    The VerifiedNames are read as dicts, with the username of their user joined in the same query,
+    and their verification attempt statuses are resolved with at most one more query.
+    """
+    rows = list(verified_name_qs.values(
+        'id', 'created', 'verified_name', 'profile_name', 'verification_attempt_id',
+        'proctored_exam_attempt_id', 'status', username=F('user__username'),
+    ))
+    attempt_statuses = VerifiedName.get_verification_attempt_statuses(row['verification_attempt_id'] for row in rows)
+    # formats the dates as VerifiedNameSerializer does, according to the REST framework settings
+    created_field = serializers.DateTimeField()
+
+    return [
+        {
+            'id': row['id'],
+            'created': created_field.to_representation(row['created']),
+            'username': row['username'],
+            'verified_name': row['verified_name'],
+            'profile_name': row['profile_name'],
+            'verification_attempt_id': row['verification_attempt_id'],
+            'verification_attempt_status': attempt_statuses.get(row['verification_attempt_id']),
+            'proctored_exam_attempt_id': row['proctored_exam_attempt_id'],
+            'status': row['status'],
+        }
+        for row in rows
+    ]
+
+
 class UpdateVerifiedNameSerializer(VerifiedNameSerializer):
     """
     Serializer for updates to the VerifiedName Model.
@@ -79,3 +116,22 @@ class VerifiedNameConfigSerializer(serializers.ModelSerializer):
         model = VerifiedNameConfig
 
         fields = ("change_date", "username", "use_verified_name_for_certs")
+
+
+class BulkVerifiedNameRequestSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Serializer for requests for the VerifiedNames of many users.
+    """
+    usernames = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    user_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        num_users = len(attrs['usernames']) + len(attrs['user_ids'])
+        if not num_users:
+            raise serializers.ValidationError('At least one username or user_id must be given')
+
+        max_users = getattr(settings, 'VERIFIED_NAME_BULK_MAX_USERS', DEFAULT_BULK_MAX_USERS)
+        if num_users > max_users:
+            raise serializers.ValidationError(f'No more than {max_users} users may be requested at once')
+
+        return attrs
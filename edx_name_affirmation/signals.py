@@ -2,6 +2,20 @@
 Name Affirmation signals
 """
 
+from django.db import transaction
 from django.dispatch import Signal
 
 VERIFIED_NAME_APPROVED = Signal()
+
+
+def send_verified_name_approved(user_id, profile_name):
+    """
+    Send VERIFIED_NAME_APPROVED for a VerifiedName once the current transaction commits, or immediately
+    outside of a transaction. Receivers may queue work that reads the VerifiedName, so they must not be
+    notified before it is visible to other connections.
+    """
+    transaction.on_commit(lambda: VERIFIED_NAME_APPROVED.send(
+        sender='name_affirmation',
+        user_id=user_id,
+        profile_name=profile_name,
+    ))
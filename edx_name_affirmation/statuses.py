@@ -32,6 +32,23 @@ class VerifiedNameStatus(str, Enum):
     APPROVED = "approved"
     DENIED = "denied"
 
+    @classmethod
+    def allowed_predecessors(cls, status):
+        """
+        Return the statuses from which a verified name may transition to the given status
+        """
+        # mapping from a verified name status (key) to the statuses it may be reached from (value). A
+        # verified name never goes back to pending or submitted, but a decision may be reversed by a
+        # later review of the same attempt.
+        predecessors_mapping = {
+            cls.PENDING: (),
+            cls.SUBMITTED: (cls.PENDING,),
+            cls.APPROVED: (cls.PENDING, cls.SUBMITTED, cls.DENIED),
+            cls.DENIED: (cls.PENDING, cls.SUBMITTED, cls.APPROVED),
+        }
+
+        return predecessors_mapping.get(status, ())
+
     @classmethod
     def trigger_state_change_from_idv(cls, idv_status):
         """
@@ -0,0 +1,95 @@
+"""
+Metrics of name affirmation task executions.
+
+Each execution of a task reports how long it waited in the queue, how long it ran, how many
+database queries it issued, and the branch it took and the number of rows it touched, as set
+by the task. The metrics are set as custom monitoring attributes, and passed to the callable
+named by the VERIFIED_NAME_TASK_METRICS_HOOK setting, if any.
+"""
+
+import logging
+import time
+
+from edx_django_utils.monitoring import set_custom_attribute
+
+from django.conf import settings
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+log = logging.getLogger(__name__)
+
+# Header recording when a task was published, as a UNIX timestamp
+ENQUEUED_AT_HEADER = 'name_affirmation_enqueued_at'
+
+CUSTOM_ATTRIBUTE_PREFIX = 'name_affirmation_task'
+
+
+class TaskMetrics:
+    """
+    Metrics of a single execution of a task.
+    """
+
+    def __init__(self, request):
+        self.started_at = time.time()
+        self.values = {'queue_delay_seconds': _get_queue_delay(request, self.started_at), 'query_count': 0}
+        self._started_perf_counter = time.perf_counter()
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def count_query(self, execute, sql, params, many, context):
+        """
+        Database execute wrapper counting the queries issued by the task.
+        """
+        self.values['query_count'] += 1
+        return execute(sql, params, many, context)
+
+    def start(self):
+        connection.execute_wrappers.append(self.count_query)
+
+    def finish(self, task_name, status):
+        """
+        Stop counting queries and report the metrics of the execution.
+        """
+        if self.count_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(self.count_query)
+        self.values['execution_seconds'] = time.perf_counter() - self._started_perf_counter
+        self.values['status'] = status
+        emit_task_metrics(task_name, self.values)
+
+
+def emit_task_metrics(task_name, metrics):
+    """
+    Set the metrics of a task execution as custom attributes, and pass them to the metrics hook.
+    """
+    set_custom_attribute(f'{CUSTOM_ATTRIBUTE_PREFIX}.name', task_name)
+    for name, value in metrics.items():
+        if value is not None:
+            set_custom_attribute(f'{CUSTOM_ATTRIBUTE_PREFIX}.{name}', value)
+
+    hook_path = getattr(settings, 'VERIFIED_NAME_TASK_METRICS_HOOK', None)
+    if hook_path:
+        try:
+            import_string(hook_path)(task_name, dict(metrics))
+        except Exception:
+            # metrics must never make a task fail
+            log.exception('VerifiedName: task metrics hook %s failed for %s', hook_path, task_name)
+
+
+def _get_queue_delay(request, started_at):
+    """
+    Return the number of seconds the task waited for a worker, or None if it is not known.
+
+    The delay is counted from the time the task was due, for tasks published with a countdown.
+    """
+    enqueued_at = getattr(request, ENQUEUED_AT_HEADER, None) or (request.headers or {}).get(ENQUEUED_AT_HEADER)
+    if enqueued_at is None:
+        return None
+
+    due_at = enqueued_at
+    if request.eta:
+        eta = parse_datetime(request.eta) if isinstance(request.eta, str) else request.eta
+        if eta:
+            due_at = max(due_at, eta.timestamp())
+    return max(started_at - due_at, 0)
@@ -1,18 +1,37 @@
-# pylint: disable=logging-format-interpolation, unused-argument
+# pylint: disable=logging-format-interpolation
 """
 Name affirmation celery tasks
 """
 
 import logging
+import time
+from collections import defaultdict
+from functools import wraps
 
-from celery import shared_task
-from edx_django_utils.monitoring import set_code_owner_attribute
+from celery import Task, shared_task
+from edx_django_utils.monitoring import set_code_owner_attribute, set_custom_attribute
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import InterfaceError, OperationalError, transaction
 from django.db.models import Q
+from django.utils import timezone
 
-from edx_name_affirmation.models import VerifiedName
+from edx_name_affirmation.api import transition_verified_name_status
+from edx_name_affirmation.caching import invalidate_user_cache
+from edx_name_affirmation.coalescing import IDV_STATUS_RANKS, claim_idv_update
+from edx_name_affirmation.idempotency import (
+    clear_processed_events,
+    get_processed_statuses,
+    is_event_processed,
+    mark_event_processed,
+    mark_events_processed
+)
+from edx_name_affirmation.models import VerifiedName, VerifiedNameUserLock
+from edx_name_affirmation.name_resolution import resolve_idv_update_names, resolve_proctoring_update_names
+from edx_name_affirmation.signals import send_verified_name_approved
 from edx_name_affirmation.statuses import VerifiedNameStatus
+from edx_name_affirmation.task_metrics import CUSTOM_ATTRIBUTE_PREFIX, ENQUEUED_AT_HEADER, TaskMetrics
 
 User = get_user_model()
 
@@ -20,16 +39,181 @@ log = logging.getLogger(__name__)
 
 DEFAULT_RETRY_SECONDS = 30
 MAX_RETRIES = 3
+MAX_RETRY_SECONDS = 10 * 60
 
+# Number of VerifiedNames deleted per transaction by delete_verified_name_task
+DELETE_BATCH_SIZE = 500
 
-@shared_task(
-    bind=True, autoretry_for=(Exception,), default_retry_delay=DEFAULT_RETRY_SECONDS, max_retries=MAX_RETRIES,
-)
+# Number of IDV attempt updates applied per transaction by bulk_idv_update_verified_names_task
+BULK_UPDATE_BATCH_SIZE = 500
+
+# Errors that may not happen again when a task is retried, such as lost database connections, lock
+# wait timeouts and deadlocks. Any other error, such as a missing user, fails the task immediately.
+RETRIABLE_ERRORS = (OperationalError, InterfaceError)
+
+
+class NameAffirmationTask(Task):  # pylint: disable=abstract-method
+    """
+    Base class of the name affirmation tasks.
+
+    Retriable errors are retried with an exponential backoff, starting from
+    VERIFIED_NAME_TASK_RETRY_SECONDS seconds and capped at VERIFIED_NAME_TASK_MAX_RETRY_SECONDS,
+    up to VERIFIED_NAME_TASK_MAX_RETRIES times. The delays are randomized so that tasks failing
+    together, for instance during a database failover, are not all retried at the same time.
+
+    These settings are read once, when this module is imported, because Celery reads the retry
+    options of a task when the task is declared. Changing them, including with `override_settings`,
+    has no effect on tasks that are already declared.
+    """
+    autoretry_for = RETRIABLE_ERRORS
+    max_retries = getattr(settings, 'VERIFIED_NAME_TASK_MAX_RETRIES', MAX_RETRIES)
+    retry_backoff = getattr(settings, 'VERIFIED_NAME_TASK_RETRY_SECONDS', DEFAULT_RETRY_SECONDS)
+    retry_backoff_max = getattr(settings, 'VERIFIED_NAME_TASK_MAX_RETRY_SECONDS', MAX_RETRY_SECONDS)
+    retry_jitter = True
+
+    def apply_async(self, args=None, kwargs=None, **options):  # pylint: disable=arguments-differ
+        # the publication time is sent along with the task, to measure how long it waits for a worker
+        headers = dict(options.pop('headers', None) or {})
+        headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+        return super().apply_async(args, kwargs, headers=headers, **options)
+
+    def before_start(self, task_id, args, kwargs):
+        self.request.name_affirmation_metrics = TaskMetrics(self.request)
+        self.request.name_affirmation_metrics.start()
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        metrics = getattr(self.request, 'name_affirmation_metrics', None)
+        if metrics:
+            metrics.finish(self.name, status)
+
+    def record_metrics(self, **values):
+        """
+        Record metrics of the current execution, such as the `branch` it took and the number of `rows` it wrote.
+        """
+        metrics = getattr(self.request, 'name_affirmation_metrics', None)
+        if metrics:
+            for name, value in values.items():
+                metrics.set(name, value)
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        set_custom_attribute(f'{CUSTOM_ATTRIBUTE_PREFIX}.retries', self.request.retries + 1)
+        set_custom_attribute(f'{CUSTOM_ATTRIBUTE_PREFIX}.error', type(exc).__name__)
+        log.warning(
+            'Retrying {task_name} with task_id={task_id} after {error_name}, retry {retries} of {max_retries}'.format(
+                task_name=self.name,
+                task_id=task_id,
+                error_name=type(exc).__name__,
+                retries=self.request.retries + 1,
+                max_retries=self.max_retries,
+            )
+        )
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        set_custom_attribute(f'{CUSTOM_ATTRIBUTE_PREFIX}.failed', True)
+        set_custom_attribute(f'{CUSTOM_ATTRIBUTE_PREFIX}.error', type(exc).__name__)
+        set_custom_attribute(f'{CUSTOM_ATTRIBUTE_PREFIX}.error_retriable', isinstance(exc, RETRIABLE_ERRORS))
+        log.error(
+            '{task_name} with task_id={task_id} failed after {retries} retries with {error_name}: {error}'.format(
+                task_name=self.name,
+                task_id=task_id,
+                retries=self.request.retries,
+                error_name=type(exc).__name__,
+                error=exc,
+            )
+        )
+
+
+def _lock_users(user_ids):
+    """
+    Lock the given users until the current transaction ends, by their VerifiedNameUserLock rows.
+
+    Returns the ids of the users that exist. Users are locked in a consistent order, so that concurrent
+    transactions locking several users cannot deadlock.
+    """
+    existing_user_ids = sorted(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    VerifiedNameUserLock.objects.bulk_create(
+        [VerifiedNameUserLock(user_id=user_id) for user_id in existing_user_ids], ignore_conflicts=True,
+    )
+    list(
+        VerifiedNameUserLock.objects.select_for_update().filter(
+            user_id__in=existing_user_ids,
+        ).order_by('user_id').values_list('user_id', flat=True)
+    )
+    return set(existing_user_ids)
+
+
+def serialize_per_user(func):
+    """
+    Decorator running a task for an attempt of a user in a transaction that starts by locking the user,
+    with `_lock_users`.
+
+    Tasks for the same user, such as the IDV and proctoring updates of the user's attempts, therefore run
+    one after the other rather than interleaving their reads and writes of the user's VerifiedNames, while
+    tasks for different users still run concurrently.
+    """
+    @wraps(func)
+    def wrapper(self, attempt_id, user_id, *args, **kwargs):
+        with transaction.atomic():
+            # the lock is released when the transaction ends
+            _lock_users([user_id])
+            return func(self, attempt_id, user_id, *args, **kwargs)
+
+    return wrapper
+
+
+@shared_task(bind=True, base=NameAffirmationTask)
 @set_code_owner_attribute
-def idv_update_verified_name_task(self, attempt_id, user_id, name_affirmation_status, photo_id_name, full_name):
+@serialize_per_user
+def idv_update_verified_name_task(
+    self,
+    attempt_id,
+    user_id,
+    name_affirmation_status,
+    photo_id_name,
+    full_name,
+    coalesced=False,
+):
     """
     Celery task for updating a verified name based on an IDV attempt
+
+    If `coalesced` is True, the latest update recorded for the attempt by the handler is applied
+    instead of the one the task was scheduled with.
     """
+    if coalesced:
+        latest_update = claim_idv_update(attempt_id, user_id)
+        if latest_update:
+            name_affirmation_status = latest_update['status']
+            photo_id_name = latest_update['photo_id_name']
+            full_name = latest_update['full_name']
+
+    if is_event_processed(self.name, attempt_id, name_affirmation_status):
+        log.info('VerifiedName: idv_update_verified_name skipped for user %(user_id)s with attempt_id '
+                 '%(attempt_id)s because status %(status)s was already applied',
+                 {
+                    'user_id': user_id,
+                    'attempt_id': attempt_id,
+                    'status': name_affirmation_status
+                 }
+                 )
+        self.record_metrics(branch='duplicate', rows=0)
+        return
+
+    if photo_id_name is None or full_name is None:
+        # the update was sent without names, which are resolved from the attempt and the user
+        [(_, _, _, photo_id_name, full_name)] = resolve_idv_update_names(
+            [(attempt_id, user_id, name_affirmation_status, photo_id_name, full_name)]
+        )
+        if photo_id_name is None:
+            log.error(
+                'Cannot update VerifiedNames for user={user_id} with verification_attempt_id={attempt_id} '
+                'because the name on its photo ID could not be resolved'.format(
+                    user_id=user_id,
+                    attempt_id=attempt_id,
+                )
+            )
+            self.record_metrics(branch='unresolved_name', rows=0)
+            return
+
     log.info('VerifiedName: idv_update_verified_name triggering Celery task started for user %(user_id)s '
              'with attempt_id %(attempt_id)s and status %(status)s',
              {
@@ -46,37 +230,27 @@ def idv_update_verified_name_task(self, attempt_id, user_id, name_affirmation_st
         (Q(verification_attempt_id=attempt_id) | Q(verification_attempt_id__isnull=True))
         & Q(user__id=user_id)
         & Q(verified_name=photo_id_name)
-    ).order_by('-created')
+    ).order_by('-created', '-id')
     if verified_names:
-        # if there are VerifiedName objects, we want to update existing entries
-        # for each attempt with no attempt id (either proctoring or idv), update attempt id
-        updated_for_attempt_id = verified_names.filter(
-            proctored_exam_attempt_id=None,
-            verification_attempt_id=None
-        ).update(verification_attempt_id=attempt_id)
-
-        if updated_for_attempt_id:
-            log.info(
-                'Updated VerifiedNames for user={user_id} to verification_attempt_id={attempt_id}'.format(
-                    user_id=user_id,
-                    attempt_id=attempt_id,
-                )
-            )
+        # if there are VerifiedName objects, we want to update existing entries. Entries with no
+        # attempt id (either proctoring or idv) are linked to the attempt, and every entry of the
+        # attempt is transitioned to its status, by a single write
+        verified_name_qs = verified_names.filter(proctored_exam_attempt_id=None)
+        unlinked_verified_name_ids = verified_name_qs.filter(
+            verification_attempt_id=None,
+        ).values_list('id', flat=True)
 
-        # then for all matching attempt ids, update the status
-        verified_name_qs = verified_names.filter(
-            verification_attempt_id=attempt_id,
-            proctored_exam_attempt_id=None
+        num_updated = transition_verified_name_status(
+            verified_name_qs,
+            name_affirmation_status,
+            verification_attempt_ids={verified_name_id: attempt_id for verified_name_id in unlinked_verified_name_ids},
         )
-
-        # Individually update to ensure that post_save signals send
-        for verified_name_obj in verified_name_qs:
-            verified_name_obj.status = name_affirmation_status
-            verified_name_obj.save()
+        self.record_metrics(branch='update', rows=num_updated)
 
         log.info(
-            'Updated VerifiedNames for user={user_id} with verification_attempt_id={attempt_id} to '
-            'have status={status}'.format(
+            'Updated {num_updated} VerifiedNames for user={user_id} with verification_attempt_id={attempt_id} '
+            'to have status={status}'.format(
+                num_updated=num_updated,
                 user_id=user_id,
                 attempt_id=attempt_id,
                 status=name_affirmation_status
@@ -92,6 +266,7 @@ def idv_update_verified_name_task(self, attempt_id, user_id, name_affirmation_st
             verification_attempt_id=attempt_id,
             status=name_affirmation_status,
         )
+        self.record_metrics(branch='create', rows=1)
         log.error(
             'Created VerifiedName for user={user_id} to have status={status} '
             'and verification_attempt_id={attempt_id}, because no matching '
@@ -102,11 +277,44 @@ def idv_update_verified_name_task(self, attempt_id, user_id, name_affirmation_st
             )
         )
 
+    mark_event_processed(self.name, attempt_id, name_affirmation_status)
 
-@shared_task(
-    bind=True, autoretry_for=(Exception,), default_retry_delay=DEFAULT_RETRY_SECONDS, max_retries=MAX_RETRIES,
-)
+
+@shared_task(bind=True, base=NameAffirmationTask)
 @set_code_owner_attribute
+def bulk_idv_update_verified_names_task(self, updates):
+    """
+    Celery task for updating verified names based on many IDV attempts at once
+
+    Each update is a list of (attempt_id, user_id, name_affirmation_status, photo_id_name, full_name), as
+    received by idv_update_verified_name_task. Only the latest update of each attempt is applied, following
+    the same rules as idv_update_verified_name_task, but with a fixed number of queries per batch of updates.
+    """
+    latest_updates = {}
+    for attempt_id, user_id, name_affirmation_status, photo_id_name, full_name in updates:
+        latest_update = latest_updates.get((user_id, attempt_id))
+        # as when updates are coalesced, a later update never replaces one of a higher rank
+        rank = IDV_STATUS_RANKS.get(name_affirmation_status, 0)
+        if latest_update and IDV_STATUS_RANKS.get(latest_update[2], 0) > rank:
+            continue
+        latest_updates[(user_id, attempt_id)] = (attempt_id, user_id, name_affirmation_status, photo_id_name, full_name)
+
+    latest_updates = list(latest_updates.values())
+    log.info(
+        'Applying {num_updates} IDV attempt updates out of {num_received} received'.format(
+            num_updates=len(latest_updates),
+            num_received=len(updates),
+        )
+    )
+    num_rows = 0
+    for batch_start in range(0, len(latest_updates), BULK_UPDATE_BATCH_SIZE):
+        num_rows += _apply_idv_updates(latest_updates[batch_start:batch_start + BULK_UPDATE_BATCH_SIZE])
+    self.record_metrics(branch='bulk', rows=num_rows, updates=len(latest_updates))
+
+
+@shared_task(bind=True, base=NameAffirmationTask)
+@set_code_owner_attribute
+@serialize_per_user
 def proctoring_update_verified_name_task(
     self,
     attempt_id,
@@ -118,16 +326,33 @@ def proctoring_update_verified_name_task(
     """
     Celery task for updating a verified name based on a proctoring attempt
     """
+    if is_event_processed(self.name, attempt_id, name_affirmation_status):
+        log.info(
+            'Skipped update of VerifiedName for user={user_id} with proctored_exam_attempt_id={attempt_id} '
+            'because status={status} was already applied'.format(
+                user_id=user_id,
+                attempt_id=attempt_id,
+                status=name_affirmation_status
+            )
+        )
+        self.record_metrics(branch='duplicate', rows=0)
+        return
+
+    if full_name is None or profile_name is None:
+        # the update was sent without names, which are resolved from the user
+        [(_, _, _, full_name, profile_name)] = resolve_proctoring_update_names(
+            [(attempt_id, user_id, name_affirmation_status, full_name, profile_name)]
+        )
 
     approved_verified_name = VerifiedName.objects.filter(
         user__id=user_id,
         status=VerifiedNameStatus.APPROVED
-    ).order_by('-created').first()
+    ).order_by('-created', '-id').first()
 
     verified_name_for_exam = VerifiedName.objects.filter(
         user__id=user_id,
         proctored_exam_attempt_id=attempt_id
-    ).order_by('-created').first()
+    ).order_by('-created', '-id').first()
 
     # check if approved VerifiedName already exists for the user, and skip
     # update if no VerifiedName has already been created for this specific exam
@@ -141,19 +366,34 @@ def proctoring_update_verified_name_task(
                     name_id=approved_verified_name.id
                 )
             )
+        self.record_metrics(branch='already_approved', rows=0)
+        mark_event_processed(self.name, attempt_id, name_affirmation_status)
         return
 
     if verified_name_for_exam:
-        verified_name_for_exam.status = name_affirmation_status
-        verified_name_for_exam.save()
-        log.info(
-            'Updated VerifiedName for user={user_id} with proctored_exam_attempt_id={attempt_id} '
-            'to have status={status}'.format(
-                user_id=user_id,
-                attempt_id=attempt_id,
-                status=name_affirmation_status
-            )
+        num_transitioned = transition_verified_name_status(
+            VerifiedName.objects.filter(id=verified_name_for_exam.id), name_affirmation_status,
         )
+        self.record_metrics(branch='update', rows=num_transitioned)
+        if num_transitioned:
+            log.info(
+                'Updated VerifiedName for user={user_id} with proctored_exam_attempt_id={attempt_id} '
+                'to have status={status}'.format(
+                    user_id=user_id,
+                    attempt_id=attempt_id,
+                    status=name_affirmation_status
+                )
+            )
+        else:
+            log.info(
+                'Did not update VerifiedName for user={user_id} with proctored_exam_attempt_id={attempt_id} '
+                'from status={current_status} to status={status}'.format(
+                    user_id=user_id,
+                    attempt_id=attempt_id,
+                    current_status=verified_name_for_exam.status,
+                    status=name_affirmation_status
+                )
+            )
     else:
         if full_name and profile_name:
             # if they do not already have an approved VerifiedName, create one
@@ -165,6 +405,7 @@ def proctoring_update_verified_name_task(
                 status=name_affirmation_status,
                 profile_name=profile_name
             )
+            self.record_metrics(branch='create', rows=1)
             log.info(
                 'Created VerifiedName for user={user_id} to have status={status} '
                 'and proctored_exam_attempt_id={attempt_id}'.format(
@@ -181,11 +422,30 @@ def proctoring_update_verified_name_task(
                     attempt_id=attempt_id,
                 )
             )
+            self.record_metrics(branch='missing_names', rows=0)
+            return
 
+    mark_event_processed(self.name, attempt_id, name_affirmation_status)
 
-@shared_task(
-    bind=True, autoretry_for=(Exception,), default_retry_delay=DEFAULT_RETRY_SECONDS, max_retries=MAX_RETRIES,
-)
+
+@shared_task(bind=True, base=NameAffirmationTask)
+@set_code_owner_attribute
+def bulk_proctoring_update_verified_names_task(self, updates):
+    """
+    Celery task for updating verified names based on many proctoring attempts at once, such as a review batch
+
+    Each update is a list of (attempt_id, user_id, name_affirmation_status, full_name, profile_name), as
+    received by proctoring_update_verified_name_task. The updates are applied in order, following the same
+    rules as proctoring_update_verified_name_task, but with a fixed number of queries per batch of updates.
+    """
+    log.info('Applying {num_updates} proctoring attempt updates'.format(num_updates=len(updates)))
+    num_rows = 0
+    for batch_start in range(0, len(updates), BULK_UPDATE_BATCH_SIZE):
+        num_rows += _apply_proctoring_updates(updates[batch_start:batch_start + BULK_UPDATE_BATCH_SIZE])
+    self.record_metrics(branch='bulk', rows=num_rows, updates=len(updates))
+
+
+@shared_task(bind=True, base=NameAffirmationTask)
 @set_code_owner_attribute
 def delete_verified_name_task(self, idv_attempt_id, proctoring_attempt_id):
     """
@@ -196,30 +456,395 @@ def delete_verified_name_task(self, idv_attempt_id, proctoring_attempt_id):
         log.error(
             'A maximum of one attempt id should be provided for either a proctored exam attempt or IDV attempt.'
         )
+        self.record_metrics(branch='invalid_arguments', rows=0)
         return
 
     log_message = {'field_name': '', 'attempt_id': ''}
 
     if idv_attempt_id:
         verified_names = VerifiedName.objects.filter(verification_attempt_id=idv_attempt_id)
+        # a later event for the attempt must be processed again, since its VerifiedNames are deleted
+        clear_processed_events(idv_update_verified_name_task.name, idv_attempt_id)
         log_message['field_name'] = 'verification_attempt_id'
         log_message['attempt_id'] = idv_attempt_id
     else:
         verified_names = VerifiedName.objects.filter(proctored_exam_attempt_id=proctoring_attempt_id)
+        clear_processed_events(proctoring_update_verified_name_task.name, proctoring_attempt_id)
         log_message['field_name'] = 'proctored_exam_attempt_id'
         log_message['attempt_id'] = proctoring_attempt_id
 
-    if verified_names:
+    num_names = verified_names.count()
+    if num_names:
         log.info(
             'Deleting {num_names} VerifiedName(s) associated with {field_name}='
             '{verification_attempt_id}'.format(
-                num_names=len(verified_names),
+                num_names=num_names,
                 field_name=log_message['field_name'],
                 verification_attempt_id=log_message['attempt_id'],
             )
         )
-        verified_names.delete()
+        num_deleted = _delete_in_batches(verified_names)
+        self.record_metrics(branch='delete', rows=num_deleted)
+        log.info(
+            'Deleted {num_deleted} VerifiedName(s) associated with {field_name}='
+            '{verification_attempt_id}'.format(
+                num_deleted=num_deleted,
+                field_name=log_message['field_name'],
+                verification_attempt_id=log_message['attempt_id'],
+            )
+        )
+    else:
+        self.record_metrics(branch='no_names', rows=0)
+        log.info(
+            'No VerifiedNames deleted because no VerifiedNames were associated with the provided attempt ID.'
+        )
+
+
+def _delete_in_batches(verified_name_qs):
+    """
+    Delete the VerifiedNames in the queryset, DELETE_BATCH_SIZE at a time, each batch in its own transaction.
+
+    The rows are deleted without loading them again for the delete signals, so their history is
+    recorded in bulk and the cache is invalidated here instead.
+
+    Returns the number of VerifiedNames deleted.
+    """
+    num_deleted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(verified_name_qs.order_by('id')[:DELETE_BATCH_SIZE])
+            if not batch:
+                break
+
+            history_date = timezone.now()
+            HistoricalVerifiedName = VerifiedName.history.model  # pylint: disable=no-member
+            HistoricalVerifiedName.objects.bulk_create([
+                HistoricalVerifiedName(
+                    history_date=history_date,
+                    history_user=HistoricalVerifiedName.get_default_history_user(verified_name),
+                    history_type='-',
+                    **{field.attname: getattr(verified_name, field.attname) for field in VerifiedName._meta.fields}
+                )
+                for verified_name in batch
+            ])
+
+            batch_qs = VerifiedName.objects.filter(id__in=[verified_name.id for verified_name in batch])
+            # _raw_delete skips the deletion collector, so it neither cascades nor sends delete signals. This
+            # relies on no model having a relation to VerifiedName, and on VerifiedName having no many-to-many
+            # field, which test_verified_name_has_no_dependent_relations enforces. The history and cache
+            # invalidation usually done by the signals are handled here instead.
+            num_deleted += batch_qs._raw_delete(batch_qs.db)  # pylint: disable=protected-access
+
+        for user_id in {verified_name.user_id for verified_name in batch}:
+            invalidate_user_cache(user_id)
+
+        if len(batch) < DELETE_BATCH_SIZE:
+            break
+
+    return num_deleted
+
+
+def _apply_idv_updates(updates):
+    """
+    Apply a batch of IDV attempt updates, at most one per attempt, in a single transaction.
+
+    The users are locked, as by `serialize_per_user`, and their candidate VerifiedNames are fetched at once.
+    The updates are then resolved in order against those VerifiedNames, and the resulting attempt links,
+    status transitions and new VerifiedNames are written in bulk.
+
+    Returns the number of rows written by its updates and inserts.
+    """
+    task_name = idv_update_verified_name_task.name
+    processed_statuses = get_processed_statuses(task_name, [update[0] for update in updates])
+    updates = [update for update in updates if processed_statuses.get(update[0]) != update[2]]
+
+    # updates sent without names have them resolved for the whole batch at once
+    updates = resolve_idv_update_names(updates)
+    for attempt_id, user_id, _, photo_id_name, _ in updates:
+        if photo_id_name is None:
+            log.error(
+                'Cannot update VerifiedNames for user={user_id} with verification_attempt_id={attempt_id} '
+                'because the name on its photo ID could not be resolved'.format(
+                    user_id=user_id,
+                    attempt_id=attempt_id,
+                )
+            )
+    updates = [update for update in updates if update[3] is not None]
+    if not updates:
+        return 0
+
+    with transaction.atomic():
+        user_ids = _lock_users({update[1] for update in updates})
+
+        verified_names_by_user_and_name = defaultdict(list)
+        for verified_name in VerifiedName.objects.filter(
+            Q(verification_attempt_id__in={update[0] for update in updates})
+            | Q(verification_attempt_id__isnull=True),
+            user_id__in=user_ids,
+            verified_name__in={update[3] for update in updates},
+        ):
+            verified_names_by_user_and_name[(verified_name.user_id, verified_name.verified_name)].append(verified_name)
+
+        linked_verified_names = {}
+        verified_name_ids_by_status = defaultdict(set)
+        verification_attempt_ids_by_status = defaultdict(dict)
+        new_verified_names = []
+        applied_statuses = {}
+        for attempt_id, user_id, name_affirmation_status, photo_id_name, full_name in updates:
+            if user_id not in user_ids:
+                log.error(
+                    'Cannot apply status={status} of verification_attempt_id={attempt_id} because '
+                    'user={user_id} does not exist'.format(
+                        status=name_affirmation_status,
+                        attempt_id=attempt_id,
+                        user_id=user_id,
+                    )
+                )
+                continue
+
+            user_verified_names = verified_names_by_user_and_name[(user_id, photo_id_name)]
+            verified_names = [
+                verified_name for verified_name in user_verified_names
+                if verified_name.verification_attempt_id in (attempt_id, None)
+            ]
+            if verified_names:
+                for verified_name in verified_names:
+                    if verified_name.proctored_exam_attempt_id is not None:
+                        continue
+                    if verified_name.verification_attempt_id is None:
+                        verified_name.verification_attempt_id = attempt_id
+                        linked_verified_names[verified_name.id] = verified_name
+                        verification_attempt_ids_by_status[name_affirmation_status][verified_name.id] = attempt_id
+                    verified_name_ids_by_status[name_affirmation_status].add(verified_name.id)
+            else:
+                verified_name = VerifiedName(
+                    user_id=user_id,
+                    verified_name=photo_id_name,
+                    profile_name=full_name,
+                    verification_attempt_id=attempt_id,
+                    status=name_affirmation_status,
+                )
+                new_verified_names.append(verified_name)
+                # later updates in the batch must find it, as they would have if it was saved
+                user_verified_names.append(verified_name)
+            applied_statuses[attempt_id] = name_affirmation_status
+
+        # VerifiedNames created above have no id yet, and are created with their status below. The others
+        # are linked to their attempt and transitioned to its status by a single write per status
+        num_updated = 0
+        for name_affirmation_status, verified_name_ids in verified_name_ids_by_status.items():
+            verified_name_ids.discard(None)
+            num_updated += transition_verified_name_status(
+                VerifiedName.objects.filter(id__in=verified_name_ids),
+                name_affirmation_status,
+                verification_attempt_ids=verification_attempt_ids_by_status[name_affirmation_status],
+            )
+
+        if new_verified_names:
+            _bulk_create_with_history(new_verified_names, 'verification_attempt_id')
+
+        mark_events_processed(task_name, applied_statuses)
+
+    # bulk operations do not send post_save, so their side effects are handled here
+    for user_id in {verified_name.user_id for verified_name in new_verified_names}:
+        invalidate_user_cache(user_id)
+
+    for verified_name in new_verified_names:
+        if verified_name.status == VerifiedNameStatus.APPROVED:
+            send_verified_name_approved(verified_name.user_id, verified_name.profile_name)
+
+    log.info(
+        'Applied {num_updates} IDV attempt updates, linking {num_linked} and creating {num_created} '
+        'VerifiedNames'.format(
+            num_updates=len(applied_statuses),
+            num_linked=len(linked_verified_names),
+            num_created=len(new_verified_names),
+        )
+    )
+    return num_updated + len(new_verified_names)
+
+
+def _apply_proctoring_updates(updates):
+    """
+    Apply a batch of proctoring attempt updates in a single transaction.
+
+    The users are locked, as by `serialize_per_user`, and their approved VerifiedNames and the VerifiedNames
+    of the attempts are fetched at once. The updates are then resolved in order against those VerifiedNames,
+    and the resulting status transitions and new VerifiedNames are written in bulk.
+
+    Returns the number of rows written by its updates and inserts.
+    """
+    task_name = proctoring_update_verified_name_task.name
+    processed_statuses = get_processed_statuses(task_name, [update[0] for update in updates])
+    updates = [update for update in updates if processed_statuses.get(update[0]) != update[2]]
+    if not updates:
+        return 0
+
+    # updates sent without names have them resolved for the whole batch at once
+    updates = resolve_proctoring_update_names(updates)
+
+    with transaction.atomic():
+        user_ids = _lock_users({update[1] for update in updates})
+
+        verified_names_for_exams = {}
+        for verified_name in VerifiedName.objects.filter(
+            user_id__in=user_ids,
+            proctored_exam_attempt_id__in={update[0] for update in updates},
+        ).order_by('created', 'id'):
+            # the most recent VerifiedName of each attempt is kept
+            verified_names_for_exams[(verified_name.user_id, verified_name.proctored_exam_attempt_id)] = verified_name
+        initial_statuses = {
+            verified_name.id: verified_name.status for verified_name in verified_names_for_exams.values()
+        }
+        exam_verified_names_by_user = defaultdict(list)
+        for (user_id, _), verified_name in verified_names_for_exams.items():
+            exam_verified_names_by_user[user_id].append(verified_name)
+
+        # the statuses of the VerifiedNames of the exams may change within the batch, so the most recent
+        # approved VerifiedName of a user is found amongst them and the most recent one the batch cannot change
+        other_approved_verified_names = {}
+        for verified_name in VerifiedName.objects.filter(
+            user_id__in=user_ids,
+            status=VerifiedNameStatus.APPROVED,
+        ).exclude(id__in=initial_statuses).order_by('created', 'id'):
+            other_approved_verified_names[verified_name.user_id] = verified_name
+
+        new_verified_names = []
+        applied_statuses = {}
+        for attempt_id, user_id, name_affirmation_status, full_name, profile_name in updates:
+            if user_id not in user_ids:
+                log.error(
+                    'Cannot apply status={status} of proctored_exam_attempt_id={attempt_id} because '
+                    'user={user_id} does not exist'.format(
+                        status=name_affirmation_status,
+                        attempt_id=attempt_id,
+                        user_id=user_id,
+                    )
+                )
+                continue
+
+            approved_verified_name = _get_most_recent_approved_verified_name(
+                [other_approved_verified_names.get(user_id), *exam_verified_names_by_user[user_id]]
+            )
+            verified_name_for_exam = verified_names_for_exams.get((user_id, attempt_id))
+            if approved_verified_name and not verified_name_for_exam:
+                if approved_verified_name.verified_name != full_name:
+                    log.warning(
+                        'Full name for proctored_exam_attempt_id={attempt_id} is not equal '
+                        'to the most recent verified name verified_name_id={name_id}.'.format(
+                            attempt_id=attempt_id,
+                            name_id=approved_verified_name.id
+                        )
+                    )
+            elif verified_name_for_exam:
+                # transitions are resolved here, so that only the final status of each VerifiedName is written
+                if verified_name_for_exam.status in VerifiedNameStatus.allowed_predecessors(name_affirmation_status):
+                    verified_name_for_exam.status = name_affirmation_status
+            elif full_name and profile_name:
+                verified_name_for_exam = VerifiedName(
+                    user_id=user_id,
+                    verified_name=full_name,
+                    proctored_exam_attempt_id=attempt_id,
+                    status=name_affirmation_status,
+                    profile_name=profile_name
+                )
+                new_verified_names.append(verified_name_for_exam)
+                verified_names_for_exams[(user_id, attempt_id)] = verified_name_for_exam
+                exam_verified_names_by_user[user_id].append(verified_name_for_exam)
+            else:
+                log.error(
+                    'Cannot create VerifiedName for user={user_id} for proctored_exam_attempt_id={attempt_id} '
+                    'because neither profile name nor full name were provided'.format(
+                        user_id=user_id,
+                        attempt_id=attempt_id,
+                    )
+                )
+                continue
+
+            applied_statuses[attempt_id] = name_affirmation_status
+
+        verified_name_ids_by_status = defaultdict(set)
+        for verified_name in verified_names_for_exams.values():
+            if verified_name.id and verified_name.status != initial_statuses[verified_name.id]:
+                verified_name_ids_by_status[verified_name.status].add(verified_name.id)
+        num_transitioned = 0
+        for name_affirmation_status, verified_name_ids in verified_name_ids_by_status.items():
+            num_transitioned += transition_verified_name_status(
+                VerifiedName.objects.filter(id__in=verified_name_ids), name_affirmation_status,
+            )
+
+        if new_verified_names:
+            _bulk_create_with_history(new_verified_names, 'proctored_exam_attempt_id')
+
+        mark_events_processed(task_name, applied_statuses)
+
+    # bulk operations do not send post_save, so their side effects are handled here
+    for user_id in {verified_name.user_id for verified_name in new_verified_names}:
+        invalidate_user_cache(user_id)
+
+    for verified_name in new_verified_names:
+        if verified_name.status == VerifiedNameStatus.APPROVED:
+            send_verified_name_approved(verified_name.user_id, verified_name.profile_name)
 
     log.info(
-        'No VerifiedNames deleted because no VerifiedNames were associated with the provided attempt ID.'
+        'Applied {num_updates} proctoring attempt updates, updating {num_updated} and creating {num_created} '
+        'VerifiedNames'.format(
+            num_updates=len(applied_statuses),
+            num_updated=num_transitioned,
+            num_created=len(new_verified_names),
+        )
     )
+    return num_transitioned + len(new_verified_names)
+
+
+def _get_most_recent_approved_verified_name(verified_names):
+    """
+    Return the most recently created of the given VerifiedNames which is approved, or None.
+
+    VerifiedNames which are not created yet are more recent than any other, in the order given.
+    """
+    most_recent_approved_verified_name = None
+    for verified_name in verified_names:
+        if not verified_name or verified_name.status != VerifiedNameStatus.APPROVED:
+            continue
+        if (
+            most_recent_approved_verified_name is None
+            or verified_name.id is None
+            or (
+                most_recent_approved_verified_name.id is not None
+                and (verified_name.created, verified_name.id)
+                > (most_recent_approved_verified_name.created, most_recent_approved_verified_name.id)
+            )
+        ):
+            most_recent_approved_verified_name = verified_name
+    return most_recent_approved_verified_name
+
+
+def _bulk_create_with_history(verified_names, attempt_field):
+    """
+    Create the given VerifiedNames and their history records, with a fixed number of queries.
+
+    Databases which cannot return the ids of rows created in bulk, such as MySQL, leave the created
+    VerifiedNames without an id. They are then read back with a single query, by their user, the
+    `attempt_field` of their attempt and their creation date, which together identify each of them,
+    since a batch creates at most one VerifiedName per user and attempt.
+    """
+    created = timezone.now()
+    for verified_name in verified_names:
+        verified_name.created = created
+    VerifiedName.objects.bulk_create(verified_names)
+
+    if any(verified_name.id is None for verified_name in verified_names):
+        attempt_ids = {getattr(verified_name, attempt_field) for verified_name in verified_names}
+        created_ids = {
+            (user_id, attempt_id): verified_name_id
+            for verified_name_id, user_id, attempt_id in VerifiedName.objects.filter(
+                user_id__in={verified_name.user_id for verified_name in verified_names},
+                created=created,
+                **{f'{attempt_field}__in': attempt_ids},
+            ).values_list('id', 'user_id', attempt_field)
+        }
+        for verified_name in verified_names:
+            verified_name.id = created_ids[(verified_name.user_id, getattr(verified_name, attempt_field))]
+
+    VerifiedName.history.bulk_history_create(verified_names, default_date=created)  # pylint: disable=no-member
@@ -3,17 +3,28 @@ Tests for the `edx_name_affirmation` Python API.
 """
 
 import ddt
+from edx_django_utils.cache import RequestCache
+from mock import patch
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import TestCase
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
 from edx_name_affirmation.api import (
     create_verified_name,
     create_verified_name_config,
+    delete_verified_name,
+    get_certificate_name,
+    get_certificate_names,
     get_verified_name,
+    get_verified_name_configs,
     get_verified_name_history,
+    get_verified_name_history_page,
+    get_verified_names,
     should_use_verified_name_for_certs,
+    transition_verified_name_status,
     update_verification_attempt_id,
     update_verified_name_status
 )
@@ -21,6 +32,7 @@ from edx_name_affirmation.exceptions import (
     VerifiedNameAttemptIdNotGiven,
     VerifiedNameDoesNotExist,
     VerifiedNameEmptyString,
+    VerifiedNameHistoryInvalidCursor,
     VerifiedNameMultipleAttemptIds
 )
 from edx_name_affirmation.models import VerifiedName, VerifiedNameConfig
@@ -44,7 +56,8 @@ class TestVerifiedNameAPI(TestCase):
         self.user = User(username='jondoe', email='jondoe@test.com')
         self.user.save()
         # Create a fresh config with default values
-        VerifiedNameConfig.objects.create(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            VerifiedNameConfig.objects.create(user=self.user)
 
     def tearDown(self):
         super().tearDown()
@@ -190,6 +203,152 @@ class TestVerifiedNameAPI(TestCase):
         else:
             self.assertIsNone(verified_name_obj)
 
+    @ddt.data(
+        (False, None),
+        (True, None),
+        (False, [VerifiedNameStatus.PENDING]),
+    )
+    @ddt.unpack
+    def test_get_verified_names(self, is_verified, statuses_to_exclude):
+        """
+        Test that the bulk lookup returns the same VerifiedName as `get_verified_name` for every user.
+        """
+        other_user = User(username='bobsmith', email='bobsmith@test.com')
+        other_user.save()
+        user_without_names = User(username='janedoe', email='janedoe@test.com')
+        user_without_names.save()
+
+        self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+        self._create_verified_name(status=VerifiedNameStatus.PENDING)
+        create_verified_name(other_user, 'Robert Smith', 'Bob Smith', status=VerifiedNameStatus.APPROVED)
+        create_verified_name(other_user, 'Rob Smith', 'Bob Smith', status=VerifiedNameStatus.DENIED)
+
+        users = [self.user, other_user, user_without_names]
+        with self.assertNumQueries(1):
+            verified_names = get_verified_names([user.id for user in users], is_verified, statuses_to_exclude)
+
+        for user in users:
+            expected = get_verified_name(user, is_verified, statuses_to_exclude)
+            if expected:
+                self.assertEqual(verified_names[user.id], expected)
+            else:
+                self.assertNotIn(user.id, verified_names)
+
+    @patch('edx_name_affirmation.api.BULK_QUERY_CHUNK_SIZE', 2)
+    def test_get_verified_names_chunked(self):
+        """
+        Test that the bulk lookup issues one query per chunk of users.
+        """
+        users = [self.user]
+        for index in range(4):
+            user = User(username=f'user{index}', email=f'user{index}@test.com')
+            user.save()
+            users.append(user)
+        for user in users:
+            create_verified_name(user, self.VERIFIED_NAME, self.PROFILE_NAME)
+
+        with self.assertNumQueries(3):
+            verified_names = get_verified_names([user.id for user in users])
+
+        self.assertEqual(set(verified_names), {user.id for user in users})
+
+    @ddt.data(
+        (False, None),
+        (True, None),
+        (False, [VerifiedNameStatus.PENDING]),
+    )
+    @ddt.unpack
+    def test_get_verified_name_cached(self, is_verified, statuses_to_exclude):
+        """
+        Test that repeated lookups are answered from the cache, including when no VerifiedName exists.
+        """
+        get_verified_name(self.user, is_verified, statuses_to_exclude)
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_verified_name(self.user, is_verified, statuses_to_exclude))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+        verified_name_obj = get_verified_name(self.user, is_verified, statuses_to_exclude)
+        with self.assertNumQueries(0):
+            cached_verified_name_obj = get_verified_name(self.user, is_verified, statuses_to_exclude)
+            self.assertEqual(cached_verified_name_obj, verified_name_obj)
+            self.assertEqual(cached_verified_name_obj.user.username, self.user.username)
+
+    def test_get_verified_name_cache_invalidated(self):
+        """
+        Test that saving or deleting a VerifiedName invalidates every cached lookup for its user only.
+        """
+        other_user = User(username='bobsmith', email='bobsmith@test.com')
+        other_user.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_verified_name(other_user, 'Robert Smith', 'Bob Smith')
+        other_verified_name_obj = get_verified_name(other_user)
+
+        verified_name_obj = self._create_verified_name()
+        self.assertIsNone(get_verified_name(self.user, is_verified=True))
+
+        verified_name_obj.status = VerifiedNameStatus.APPROVED
+        verified_name_obj.save()
+        self.assertEqual(get_verified_name(self.user, is_verified=True).status, VerifiedNameStatus.APPROVED)
+        self.assertEqual(get_verified_name(self.user).status, VerifiedNameStatus.APPROVED)
+
+        delete_verified_name(verified_name_obj.id)
+        self.assertIsNone(get_verified_name(self.user, is_verified=True))
+        self.assertIsNone(get_verified_name(self.user))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_verified_name(other_user), other_verified_name_obj)
+
+    def test_get_verified_name_negative_cache(self):
+        """
+        Test that once a user is known to have no VerifiedName, every lookup is answered without a query.
+        """
+        with self.assertNumQueries(2):
+            self.assertIsNone(get_verified_name(self.user, is_verified=True))
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_verified_name(self.user))
+            self.assertIsNone(get_verified_name(self.user, statuses_to_exclude=[VerifiedNameStatus.DENIED]))
+            self.assertEqual(list(get_verified_name_history(self.user)), [])
+            self.assertEqual(get_verified_name_history_page(self.user), ([], None))
+
+    def test_get_verified_name_negative_cache_invalidated(self):
+        """
+        Test that the negative cache is invalidated when a VerifiedName is created or deleted.
+        """
+        self.assertIsNone(get_verified_name(self.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            verified_name_obj = VerifiedName.objects.create(
+                user=self.user, verified_name=self.VERIFIED_NAME, profile_name=self.PROFILE_NAME,
+            )
+        self.assertEqual(get_verified_name(self.user), verified_name_obj)
+        self.assertIsNone(get_verified_name(self.user, is_verified=True))
+        self.assertEqual(list(get_verified_name_history(self.user)), [verified_name_obj])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            verified_name_obj.delete()
+        self.assertIsNone(get_verified_name(self.user, is_verified=True))
+        self.assertEqual(list(get_verified_name_history(self.user)), [])
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_verified_name(self.user))
+
+    def test_get_verified_name_rolled_back(self):
+        """
+        Test that a VerifiedName looked up within a transaction which is rolled back is not cached.
+        """
+        self.assertIsNone(get_verified_name(self.user, is_verified=True))
+
+        with transaction.atomic():
+            self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+            self.assertEqual(get_verified_name(self.user, is_verified=True).status, VerifiedNameStatus.APPROVED)
+            transaction.set_rollback(True)
+
+        self.assertIsNone(get_verified_name(self.user, is_verified=True))
+        # once the transaction is rolled back, lookups are cached again
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_verified_name(self.user, is_verified=True))
+
     def test_get_verified_name_history(self):
         """
         Test that get_verified_name_history returns all of the user's VerifiedNames
@@ -202,6 +361,57 @@ class TestVerifiedNameAPI(TestCase):
         self.assertEqual(verified_name_qs[1].id, verified_name_first.id)
         self.assertEqual(verified_name_qs[0].id, verified_name_second.id)
 
+    @ddt.data(False, True)
+    def test_get_verified_name_history_page(self, same_created):
+        """
+        Test that paging through the history returns every VerifiedName once, most recent first,
+        including VerifiedNames created at the same time.
+        """
+        for _ in range(5):
+            self._create_verified_name()
+        if same_created:
+            VerifiedName.objects.filter(user=self.user).update(created=VerifiedName.objects.first().created)
+        expected_ids = list(
+            VerifiedName.objects.filter(user=self.user).order_by('-created', '-id').values_list('id', flat=True)
+        )
+
+        page_ids = []
+        verified_names, cursor = get_verified_name_history_page(self.user, page_size=2)
+        page_ids.append([verified_name.id for verified_name in verified_names])
+        while cursor:
+            verified_names, cursor = get_verified_name_history_page(self.user, page_size=2, cursor=cursor)
+            page_ids.append([verified_name.id for verified_name in verified_names])
+
+        self.assertEqual(page_ids, [expected_ids[0:2], expected_ids[2:4], expected_ids[4:]])
+
+    @override_settings(VERIFIED_NAME_HISTORY_PAGE_SIZE=2, VERIFIED_NAME_HISTORY_MAX_PAGE_SIZE=3)
+    def test_get_verified_name_history_page_size(self):
+        """
+        Test that the page size defaults to, and is capped by, the configured page sizes.
+        """
+        for _ in range(5):
+            self._create_verified_name()
+
+        verified_names, _ = get_verified_name_history_page(self.user)
+        self.assertEqual(len(verified_names), 2)
+
+        verified_names, _ = get_verified_name_history_page(self.user, page_size=100)
+        self.assertEqual(len(verified_names), 3)
+
+    def test_get_verified_name_history_page_empty(self):
+        """
+        Test that a user without VerifiedNames has a single empty page.
+        """
+        self.assertEqual(get_verified_name_history_page(self.user), ([], None))
+
+    @ddt.data('not a cursor', 'bm90IGEgY3Vyc29y', 'MjAyMS0wMS0wMXxhYmM=')
+    def test_get_verified_name_history_page_invalid_cursor(self, cursor):
+        """
+        Test that an invalid cursor raises an exception.
+        """
+        with self.assertRaises(VerifiedNameHistoryInvalidCursor):
+            get_verified_name_history_page(self.user, cursor=cursor)
+
     def test_update_verification_attempt_id(self):
         """
         Test that the most recent VerifiedName is updated with a verification_attempt_id if
@@ -265,6 +475,30 @@ class TestVerifiedNameAPI(TestCase):
         verified_name_obj = get_verified_name(self.user)
         self.assertEqual(VerifiedNameStatus.DENIED.value, verified_name_obj.status)
 
+    def test_update_is_verified_same_created(self):
+        """
+        Test that the most recent VerifiedName of the attempt is updated when several were created at the same time.
+        """
+        created = timezone.now()
+        VerifiedName.objects.bulk_create([
+            VerifiedName(
+                user=self.user,
+                verified_name=verified_name,
+                profile_name=self.PROFILE_NAME,
+                verification_attempt_id=self.VERIFICATION_ATTEMPT_ID,
+                created=created,
+            )
+            for verified_name in ('Jonathan Doe', 'Jonathan X Doe')
+        ])
+
+        update_verified_name_status(self.user, VerifiedNameStatus.DENIED, self.VERIFICATION_ATTEMPT_ID)
+
+        self.assertEqual(
+            list(VerifiedName.objects.filter(user=self.user).order_by('id').values_list('status', flat=True)),
+            [VerifiedNameStatus.PENDING, VerifiedNameStatus.DENIED],
+        )
+        self.assertEqual(get_verified_name(self.user).status, VerifiedNameStatus.DENIED)
+
     def test_update_is_verified_no_attempt_id(self):
         """
         Test that `update_is_verified_by_attempt_id` will raise an exception with no attempt
@@ -291,6 +525,39 @@ class TestVerifiedNameAPI(TestCase):
         with self.assertRaises(VerifiedNameDoesNotExist):
             update_verified_name_status(self.user, True, self.VERIFICATION_ATTEMPT_ID)
 
+    @ddt.data(
+        (VerifiedNameStatus.PENDING, VerifiedNameStatus.SUBMITTED, True),
+        (VerifiedNameStatus.SUBMITTED, VerifiedNameStatus.APPROVED, True),
+        (VerifiedNameStatus.DENIED, VerifiedNameStatus.APPROVED, True),
+        (VerifiedNameStatus.APPROVED, VerifiedNameStatus.DENIED, True),
+        (VerifiedNameStatus.APPROVED, VerifiedNameStatus.SUBMITTED, False),
+        (VerifiedNameStatus.SUBMITTED, VerifiedNameStatus.PENDING, False),
+        (VerifiedNameStatus.APPROVED, VerifiedNameStatus.APPROVED, False),
+    )
+    @ddt.unpack
+    def test_transition_verified_name_status(self, current_status, status, should_transition):
+        """
+        Test that `transition_verified_name_status` only applies the transitions allowed by the lifecycle
+        """
+        verified_name_obj = self._create_verified_name(status=current_status)
+        other_verified_name_obj = self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal, \
+                self.captureOnCommitCallbacks(execute=True):
+            num_transitioned = transition_verified_name_status(
+                VerifiedName.objects.filter(id=verified_name_obj.id), status,
+            )
+
+        self.assertEqual(num_transitioned, int(should_transition))
+        verified_name_obj.refresh_from_db()
+        self.assertEqual(verified_name_obj.status, status if should_transition else current_status)
+        self.assertEqual(verified_name_obj.history.count(), 2 if should_transition else 1)
+        self.assertEqual(
+            mock_signal.called, should_transition and status == VerifiedNameStatus.APPROVED,
+        )
+        other_verified_name_obj.refresh_from_db()
+        self.assertEqual(other_verified_name_obj.status, VerifiedNameStatus.APPROVED)
+
     def _create_verified_name(
         self, verification_attempt_id=None, proctored_exam_attempt_id=None, status=VerifiedNameStatus.PENDING,
     ):
@@ -325,6 +592,51 @@ class TestVerifiedNameAPI(TestCase):
         should_use_for_certs = should_use_verified_name_for_certs(self.user)
         self.assertEqual(should_use_for_certs, expected_value)
 
+    def test_should_use_verified_name_for_certs_cached(self):
+        """
+        Test that the config value is cached, and invalidated when a new config is created.
+        """
+        self.assertFalse(should_use_verified_name_for_certs(self.user))
+        with self.assertNumQueries(0):
+            self.assertFalse(should_use_verified_name_for_certs(self.user))
+
+        create_verified_name_config(self.user, use_verified_name_for_certs=True)
+        self.assertTrue(should_use_verified_name_for_certs(self.user))
+
+    def test_get_verified_name_configs(self):
+        """
+        Test that the current config of every user is resolved with a single query, and cached.
+        """
+        create_verified_name_config(self.user, use_verified_name_for_certs=True)
+        user_with_old_config = User(username='bobsmith', email='bobsmith@test.com')
+        user_with_old_config.save()
+        create_verified_name_config(user_with_old_config, use_verified_name_for_certs=True)
+        create_verified_name_config(user_with_old_config, use_verified_name_for_certs=False)
+        user_without_config = User(username='janedoe', email='janedoe@test.com')
+        user_without_config.save()
+        users = [self.user, user_with_old_config, user_without_config]
+        cache.clear()
+        RequestCache.clear_all_namespaces()
+
+        with self.assertNumQueries(1), patch('edx_name_affirmation.api.cache', wraps=cache) as mock_cache:
+            configs = get_verified_name_configs(users)
+        # the configs are cached with a single call, whatever the number of users
+        self.assertEqual([name for name, _, _ in mock_cache.method_calls], ['set_many'])
+
+        self.assertEqual(
+            {user_id: config.use_verified_name_for_certs for user_id, config in configs.items()},
+            {self.user.id: True, user_with_old_config.id: False, user_without_config.id: False},
+        )
+        self.assertIsNone(configs[user_without_config.id].id)
+
+        RequestCache.clear_all_namespaces()
+        with self.assertNumQueries(0):
+            for user in users:
+                self.assertEqual(VerifiedNameConfig.current(user).id, configs[user.id].id)
+                self.assertEqual(
+                    should_use_verified_name_for_certs(user), configs[user.id].use_verified_name_for_certs,
+                )
+
     def test_create_verified_name_config(self):
         """
         Test that verified name config is created and updated successfully
@@ -344,3 +656,48 @@ class TestVerifiedNameAPI(TestCase):
         create_verified_name_config(self.user, use_verified_name_for_certs=True)
         create_verified_name_config(self.user)
         self.assertTrue(should_use_verified_name_for_certs(self.user))
+
+    @ddt.data(
+        (True, VerifiedNameStatus.APPROVED, VERIFIED_NAME),
+        (True, VerifiedNameStatus.PENDING, 'Old Name'),
+        (False, VerifiedNameStatus.APPROVED, None),
+    )
+    @ddt.unpack
+    def test_get_certificate_name(self, use_verified_name_for_certs, status, expected_name):
+        """
+        Test that the most recent approved verified name is only returned if the user opted to use it
+        for certificates.
+        """
+        create_verified_name_config(self.user, use_verified_name_for_certs=use_verified_name_for_certs)
+        create_verified_name(self.user, 'Old Name', self.PROFILE_NAME, status=VerifiedNameStatus.APPROVED)
+        self._create_verified_name(status=status)
+
+        self.assertEqual(get_certificate_name(self.user), expected_name)
+
+    def test_get_certificate_names(self):
+        """
+        Test that the bulk lookup returns the same names as `get_certificate_name`, with a single query.
+        """
+        create_verified_name_config(self.user, use_verified_name_for_certs=True)
+        self._create_verified_name(status=VerifiedNameStatus.APPROVED)
+        self._create_verified_name(status=VerifiedNameStatus.DENIED)
+
+        users = [self.user]
+        for index, (use_verified_name_for_certs, status) in enumerate([
+            (True, VerifiedNameStatus.PENDING),
+            (False, VerifiedNameStatus.APPROVED),
+            (None, VerifiedNameStatus.APPROVED),
+        ]):
+            user = User(username=f'user{index}', email=f'user{index}@test.com')
+            user.save()
+            if use_verified_name_for_certs is not None:
+                create_verified_name_config(user, use_verified_name_for_certs=use_verified_name_for_certs)
+            create_verified_name(user, f'Verified Name {index}', self.PROFILE_NAME, status=status)
+            users.append(user)
+
+        with self.assertNumQueries(1):
+            certificate_names = get_certificate_names([user.id for user in users])
+
+        self.assertEqual(certificate_names, {self.user.id: self.VERIFIED_NAME})
+        for user in users:
+            self.assertEqual(certificate_names.get(user.id), get_certificate_name(user))
@@ -3,19 +3,23 @@ Tests for Name Affirmation signal handlers
 """
 
 import ddt
-from mock import MagicMock, patch
+from mock import ANY, MagicMock, patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
 
 from edx_name_affirmation.handlers import (
     idv_attempt_handler,
     idv_delete_handler,
     proctoring_attempt_handler,
+    proctoring_attempts_handler,
     proctoring_delete_handler
 )
 from edx_name_affirmation.models import VerifiedName
 from edx_name_affirmation.statuses import VerifiedNameStatus
+from edx_name_affirmation.tasks import idv_update_verified_name_task
 
 User = get_user_model()
 
@@ -33,6 +37,10 @@ class SignalTestCase(TestCase):
         self.idv_attempt_id = 1111111
         self.proctoring_attempt_id = 2222222
 
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
 
 @ddt.ddt
 class PostSaveVerifiedNameTests(SignalTestCase):
@@ -51,7 +59,8 @@ class PostSaveVerifiedNameTests(SignalTestCase):
         """
         Test that VERIFIED_NAME_APPROVED should only send if the status is changed to approved.
         """
-        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal:
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal, \
+                self.captureOnCommitCallbacks(execute=True):
             verified_name_obj = VerifiedName.objects.create(
                 user=self.user,
                 verified_name='Jonathan Doe',
@@ -60,12 +69,14 @@ class PostSaveVerifiedNameTests(SignalTestCase):
             )
             verified_name_obj.status = status
             verified_name_obj.save()
+            # receivers are only notified once the VerifiedName is committed
+            mock_signal.assert_not_called()
 
-            self.assertEqual(mock_signal.called, should_send)
-            if should_send:
-                mock_signal.assert_called_with(
-                    sender='name_affirmation', user_id=self.user.id, profile_name=self.profile_name
-                )
+        self.assertEqual(mock_signal.called, should_send)
+        if should_send:
+            mock_signal.assert_called_with(
+                sender='name_affirmation', user_id=self.user.id, profile_name=self.profile_name
+            )
 
 
 @ddt.ddt
@@ -205,7 +216,8 @@ class IDVSignalTests(SignalTestCase):
         """
         If a VerifiedName(s) for a user and verified name exist, ensure that it is updated properly
         """
-        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal:
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal, \
+                self.captureOnCommitCallbacks(execute=True):
             VerifiedName.objects.create(
                 user=self.user,
                 verified_name=self.verified_name,
@@ -221,24 +233,26 @@ class IDVSignalTests(SignalTestCase):
                 self.profile_name
             )
 
-            # check that the attempt id and status have been updated for all three VerifiedNames
-            self.assertEqual(len(VerifiedName.objects.filter(verification_attempt_id=self.idv_attempt_id)), 1)
-            self.assertEqual(len(VerifiedName.objects.filter(status=expected_status)), 1)
+        # check that the attempt id and status have been updated for all three VerifiedNames
+        self.assertEqual(len(VerifiedName.objects.filter(verification_attempt_id=self.idv_attempt_id)), 1)
+        self.assertEqual(len(VerifiedName.objects.filter(status=expected_status)), 1)
 
-            # If the status is approved, ensure that the post_save signal is called
-            if expected_status == VerifiedNameStatus.APPROVED:
-                mock_signal.assert_called()
-            else:
-                mock_signal.assert_not_called()
+        # If the status is approved, ensure that the signal is sent once committed
+        if expected_status == VerifiedNameStatus.APPROVED:
+            mock_signal.assert_called()
+        else:
+            mock_signal.assert_not_called()
 
     @ddt.data(
         'ready',
         'must_retry',
     )
+    @patch('edx_name_affirmation.handlers.invalidate_user_cache')
     @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.delay')
-    def test_idv_non_trigger_status(self, status, mock_task):
+    def test_idv_non_trigger_status(self, status, mock_task, mock_invalidate_user_cache):
         """
-        Test that a celery task is not triggered if a non-relevant status is received
+        Test that a celery task is not triggered if a non-relevant status is received,
+        but that the user's cached responses, which show the attempt status, are invalidated
         """
         idv_attempt_handler(
             self.idv_attempt_id,
@@ -249,6 +263,283 @@ class IDVSignalTests(SignalTestCase):
         )
 
         mock_task.assert_not_called()
+        mock_invalidate_user_cache.assert_called_once_with(self.user.id)
+
+    @override_settings(VERIFIED_NAME_IDV_COALESCE_SECONDS=5)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.apply_async')
+    def test_idv_coalesce_updates(self, mock_apply_async):
+        """
+        Test that rapid updates to an attempt schedule a single task, which applies the latest status
+        """
+        for idv_status in ['created', 'submitted', 'approved']:
+            idv_attempt_handler(
+                self.idv_attempt_id,
+                self.user.id,
+                idv_status,
+                self.verified_name,
+                self.profile_name
+            )
+
+        mock_apply_async.assert_called_once_with(
+            (self.idv_attempt_id, self.user.id, VerifiedNameStatus.PENDING, self.verified_name, self.profile_name),
+            {'coalesced': True},
+            countdown=5,
+        )
+
+        args, kwargs = mock_apply_async.call_args[0]
+        idv_update_verified_name_task(*args, **kwargs)
+
+        verified_name = VerifiedName.objects.get(verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+        self.assertEqual(verified_name.history.count(), 1)
+
+        # an update received once the task has claimed the latest status schedules a new task
+        idv_attempt_handler(
+            self.idv_attempt_id,
+            self.user.id,
+            'denied',
+            self.verified_name,
+            self.profile_name
+        )
+        self.assertEqual(mock_apply_async.call_count, 2)
+
+    @override_settings(VERIFIED_NAME_IDV_COALESCE_SECONDS=5)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.apply_async')
+    def test_idv_coalesce_drops_stale_update(self, mock_apply_async):
+        """
+        Test that a status received after a later status is never applied
+        """
+        for idv_status in ['approved', 'submitted']:
+            idv_attempt_handler(
+                self.idv_attempt_id,
+                self.user.id,
+                idv_status,
+                self.verified_name,
+                self.profile_name
+            )
+        args, kwargs = mock_apply_async.call_args[0]
+        idv_update_verified_name_task(*args, **kwargs)
+
+        # a stale update arriving after the task ran is dropped without scheduling a task
+        idv_attempt_handler(
+            self.idv_attempt_id,
+            self.user.id,
+            'submitted',
+            self.verified_name,
+            self.profile_name
+        )
+
+        mock_apply_async.assert_called_once()
+        verified_name = VerifiedName.objects.get(verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+
+    @override_settings(VERIFIED_NAME_IDV_COALESCE_SECONDS=5)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.apply_async')
+    def test_idv_coalesce_failed_publish(self, mock_apply_async):
+        """
+        Test that an update received after its task failed to be published schedules a new task
+        """
+        mock_apply_async.side_effect = [ConnectionError('broker unavailable'), MagicMock()]
+        with self.assertRaises(ConnectionError):
+            idv_attempt_handler(
+                self.idv_attempt_id,
+                self.user.id,
+                'submitted',
+                self.verified_name,
+                self.profile_name
+            )
+
+        idv_attempt_handler(
+            self.idv_attempt_id,
+            self.user.id,
+            'approved',
+            self.verified_name,
+            self.profile_name
+        )
+
+        self.assertEqual(mock_apply_async.call_count, 2)
+        args, kwargs = mock_apply_async.call_args[0]
+        idv_update_verified_name_task(*args, **kwargs)
+        verified_name = VerifiedName.objects.get(verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+
+    @override_settings(VERIFIED_NAME_IDV_COALESCE_SECONDS=5)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.apply_async')
+    def test_idv_coalesce_pending_timeout(self, mock_apply_async):
+        """
+        Test that a task is only expected to be pending until shortly after its countdown, in case it is lost
+        """
+        with patch('edx_name_affirmation.coalescing.cache', wraps=cache) as mock_cache:
+            idv_attempt_handler(
+                self.idv_attempt_id,
+                self.user.id,
+                'submitted',
+                self.verified_name,
+                self.profile_name
+            )
+
+        mock_apply_async.assert_called_once()
+        mock_cache.add.assert_called_once_with(
+            ANY, True, 2 * 5 + idv_update_verified_name_task.retry_backoff_max,
+        )
+
+    @override_settings(VERIFIED_NAME_IDV_COALESCE_SECONDS=5)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.apply_async')
+    def test_idv_coalesce_concurrent_updates(self, mock_apply_async):
+        """
+        Test that a status recorded while a later status is being recorded is never applied
+        """
+        original_set = cache.set
+
+        def set_after_approved(*args, **kwargs):
+            # "approved" is recorded after "submitted" checked for a higher ranked update, but before it is cached
+            mock_set.side_effect = original_set
+            idv_attempt_handler(
+                self.idv_attempt_id,
+                self.user.id,
+                'approved',
+                self.verified_name,
+                self.profile_name
+            )
+            return original_set(*args, **kwargs)
+
+        with patch.object(cache, 'set', side_effect=set_after_approved) as mock_set:
+            idv_attempt_handler(
+                self.idv_attempt_id,
+                self.user.id,
+                'submitted',
+                self.verified_name,
+                self.profile_name
+            )
+
+        args, kwargs = mock_apply_async.call_args[0]
+        idv_update_verified_name_task(*args, **kwargs)
+
+        verified_name = VerifiedName.objects.get(verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+
+    @override_settings(VERIFIED_NAME_DISPATCH_ON_COMMIT=True)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.apply_async')
+    def test_idv_dispatch_on_commit(self, mock_apply_async):
+        """
+        Test that tasks are published once the transaction commits, and identical tasks only once
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            for idv_status in ['submitted', 'submitted', 'approved']:
+                idv_attempt_handler(
+                    self.idv_attempt_id,
+                    self.user.id,
+                    idv_status,
+                    self.verified_name,
+                    self.profile_name
+                )
+
+        mock_apply_async.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(mock_apply_async.call_count, 2)
+        mock_apply_async.assert_called_with(
+            (self.idv_attempt_id, self.user.id, VerifiedNameStatus.APPROVED, self.verified_name, self.profile_name),
+            {},
+            producer=ANY,
+        )
+
+    @override_settings(VERIFIED_NAME_DISPATCH_ON_COMMIT=True)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.apply_async')
+    def test_idv_dispatch_after_publish(self, mock_apply_async):
+        """
+        Test that tasks dispatched after a batch was published are published in a new batch
+        """
+        for idv_status in ['submitted', 'approved']:
+            with self.captureOnCommitCallbacks(execute=True):
+                idv_attempt_handler(
+                    self.idv_attempt_id,
+                    self.user.id,
+                    idv_status,
+                    self.verified_name,
+                    self.profile_name
+                )
+
+        self.assertEqual(mock_apply_async.call_count, 2)
+        mock_apply_async.assert_called_with(
+            (self.idv_attempt_id, self.user.id, VerifiedNameStatus.APPROVED, self.verified_name, self.profile_name),
+            {},
+            producer=ANY,
+        )
+
+    @override_settings(VERIFIED_NAME_DISPATCH_ON_COMMIT=True)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.apply_async')
+    def test_idv_dispatch_on_commit_rollback(self, mock_apply_async):
+        """
+        Test that tasks dispatched within a rolled back savepoint are never published
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    idv_attempt_handler(
+                        self.idv_attempt_id,
+                        self.user.id,
+                        'submitted',
+                        self.verified_name,
+                        self.profile_name
+                    )
+                    raise ValueError
+            except ValueError:
+                pass
+
+            idv_attempt_handler(
+                self.idv_attempt_id,
+                self.user.id,
+                'approved',
+                self.verified_name,
+                self.profile_name
+            )
+
+        mock_apply_async.assert_called_once_with(
+            (self.idv_attempt_id, self.user.id, VerifiedNameStatus.APPROVED, self.verified_name, self.profile_name),
+            {},
+            producer=ANY,
+        )
+
+    @override_settings(VERIFIED_NAME_MINIMAL_TASK_PAYLOADS=True)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.delay')
+    def test_idv_minimal_payload(self, mock_task):
+        """
+        Test that names are left out of the task payload when minimal payloads are enabled
+        """
+        with patch.multiple(
+            'edx_name_affirmation.name_resolution',
+            SoftwareSecurePhotoVerification=MagicMock(),
+            UserProfile=MagicMock(),
+        ):
+            idv_attempt_handler(
+                self.idv_attempt_id,
+                self.user.id,
+                'submitted',
+                self.verified_name,
+                self.profile_name
+            )
+
+        mock_task.assert_called_once_with(self.idv_attempt_id, self.user.id, VerifiedNameStatus.SUBMITTED, None, None)
+
+    @override_settings(VERIFIED_NAME_MINIMAL_TASK_PAYLOADS=True)
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.delay')
+    def test_idv_minimal_payload_unavailable(self, mock_task):
+        """
+        Test that names are still sent if the models they are resolved from are not installed
+        """
+        idv_attempt_handler(
+            self.idv_attempt_id,
+            self.user.id,
+            'submitted',
+            self.verified_name,
+            self.profile_name
+        )
+
+        mock_task.assert_called_once_with(
+            self.idv_attempt_id, self.user.id, VerifiedNameStatus.SUBMITTED, self.verified_name, self.profile_name,
+        )
 
     @patch('edx_name_affirmation.tasks.delete_verified_name_task.delay')
     def test_idv_delete_handler(self, mock_task):
@@ -309,6 +600,26 @@ class ProctoringSignalTests(SignalTestCase):
         verified_name = verified_name_query.first()
         self.assertEqual(verified_name.status, expected_status)
 
+    def test_proctoring_out_of_order_update(self):
+        """
+        If an earlier proctoring status is received after the attempt was verified, ensure that it is ignored
+        """
+        for proctoring_status in ['submitted', 'verified', 'submitted']:
+            proctoring_attempt_handler(
+                self.proctoring_attempt_id,
+                self.user.id,
+                proctoring_status,
+                self.verified_name,
+                self.profile_name,
+                True,
+                True,
+                True
+            )
+
+        verified_name = VerifiedName.objects.get(proctored_exam_attempt_id=self.proctoring_attempt_id)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+        self.assertEqual(verified_name.history.count(), 2)
+
     @ddt.data(
         ('verified', VerifiedNameStatus.APPROVED),
         ('rejected', VerifiedNameStatus.DENIED),
@@ -486,6 +797,60 @@ class ProctoringSignalTests(SignalTestCase):
 
         mock_task.assert_not_called()
 
+    def test_proctoring_attempts_handler(self):
+        """
+        Test that a batch of proctoring updates is applied in order, ignoring irrelevant updates
+        """
+        def attempt(attempt_id, status, is_practice_exam=True):
+            return {
+                'attempt_id': attempt_id,
+                'user_id': self.user.id,
+                'status': status,
+                'full_name': self.verified_name,
+                'profile_name': self.profile_name,
+                'is_practice_exam': is_practice_exam,
+                'is_proctored': True,
+                'backend_supports_onboarding': True,
+            }
+
+        other_attempt_id = self.proctoring_attempt_id + 1
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal, \
+                self.captureOnCommitCallbacks(execute=True):
+            proctoring_attempts_handler([
+                attempt(self.proctoring_attempt_id, 'submitted'),
+                attempt(self.proctoring_attempt_id, 'started'),
+                attempt(self.proctoring_attempt_id, 'verified'),
+                # a proctored exam with a backend supporting onboarding does not verify names
+                attempt(other_attempt_id, 'rejected', is_practice_exam=False),
+                # skipped, since the name was approved by the previous attempt
+                attempt(other_attempt_id + 1, 'submitted'),
+            ])
+
+        verified_name = VerifiedName.objects.get()
+        self.assertEqual(verified_name.proctored_exam_attempt_id, self.proctoring_attempt_id)
+        self.assertEqual(verified_name.status, VerifiedNameStatus.APPROVED)
+        # only the final status of the batch is written
+        self.assertEqual(verified_name.history.count(), 1)
+        mock_signal.assert_called_once()
+
+    @patch('edx_name_affirmation.tasks.bulk_proctoring_update_verified_names_task.delay')
+    def test_proctoring_attempts_handler_no_updates(self, mock_task):
+        """
+        Test that a celery task is not triggered if no update in the batch is relevant
+        """
+        proctoring_attempts_handler([{
+            'attempt_id': self.proctoring_attempt_id,
+            'user_id': self.user.id,
+            'status': 'started',
+            'full_name': self.verified_name,
+            'profile_name': self.profile_name,
+            'is_practice_exam': True,
+            'is_proctored': True,
+            'backend_supports_onboarding': True,
+        }])
+
+        mock_task.assert_not_called()
+
     @patch('edx_name_affirmation.tasks.delete_verified_name_task.delay')
     def test_proctoring_delete_handler(self, mock_task):
         """
@@ -556,3 +921,46 @@ class ProctoringSignalTests(SignalTestCase):
 
         self.assertEqual(len(VerifiedName.objects.filter()), 2)
         self.assertEqual(len(VerifiedName.objects.filter(status=VerifiedNameStatus.APPROVED)), 2)
+
+
+@override_settings(VERIFIED_NAME_DISPATCH_ON_COMMIT=True)
+class DispatchOnCommitTests(TransactionTestCase):
+    """
+    Tests for tasks dispatched on commit, across real transactions
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='tester', email='tester@test.com')
+        self.verified_name = 'Jonathan Smith'
+        self.profile_name = 'Jon Smith'
+        self.idv_attempt_id = 1111111
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.apply_async')
+    def test_dispatch_after_rollback(self, mock_apply_async):
+        """
+        Test that tasks of a rolled back transaction are never published, and do not prevent the tasks of
+        the next transaction from being published
+        """
+        try:
+            with transaction.atomic():
+                idv_attempt_handler(
+                    self.idv_attempt_id, self.user.id, 'submitted', self.verified_name, self.profile_name,
+                )
+                raise ValueError
+        except ValueError:
+            pass
+        mock_apply_async.assert_not_called()
+
+        with transaction.atomic():
+            idv_attempt_handler(self.idv_attempt_id, self.user.id, 'approved', self.verified_name, self.profile_name)
+            mock_apply_async.assert_not_called()
+
+        mock_apply_async.assert_called_once_with(
+            (self.idv_attempt_id, self.user.id, VerifiedNameStatus.APPROVED, self.verified_name, self.profile_name),
+            {},
+            producer=ANY,
+        )
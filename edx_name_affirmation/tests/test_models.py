@@ -1,10 +1,12 @@
 """
 Tests for Name Affirmation models
 """
+from unittest import skipUnless
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
 from django.test import TestCase
 
 from edx_name_affirmation.models import VerifiedName
@@ -67,6 +69,36 @@ class VerifiedNameModelTests(TestCase):
         self.verified_name.verification_attempt_id = self.idv_attempt_id
         assert self.verified_name.verification_attempt_status is self.idv_attempt_status
 
+    @patch('edx_name_affirmation.models.SoftwareSecurePhotoVerification')
+    def test_prefetch_verification_attempt_statuses(self, sspv_mock):
+        """
+        Test that the statuses of several VerifiedNames are resolved with a single query
+        """
+        sspv_mock.objects.filter.return_value.values_list.return_value = [
+            (self.idv_attempt_id, self.idv_attempt_status),
+        ]
+        self.verified_name.verification_attempt_id = self.idv_attempt_id
+        self.verified_name.save()
+        other_verified_names = [
+            VerifiedName.objects.create(
+                user=self.user, verified_name='Other Tester', verification_attempt_id=verification_attempt_id,
+            )
+            for verification_attempt_id in (self.idv_attempt_id_notfound, None)
+        ]
+
+        verified_names = VerifiedName.prefetch_verification_attempt_statuses(
+            VerifiedName.objects.filter(user=self.user).order_by('created')
+        )
+
+        sspv_mock.objects.filter.assert_called_once_with(
+            id__in={self.idv_attempt_id, self.idv_attempt_id_notfound}
+        )
+        assert [verified_name.verification_attempt_status for verified_name in verified_names] == [
+            self.idv_attempt_status, None, None,
+        ]
+        sspv_mock.objects.get.assert_not_called()
+        assert other_verified_names[1].verification_attempt_status is None
+
     # Helper methods
 
     def _obj(self, dictionary):
@@ -83,3 +115,39 @@ class VerifiedNameModelTests(TestCase):
             return self._obj({'status': self.idv_attempt_status})
 
         return self._obj({'status': None})
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are only checked against SQLite')
+class VerifiedNameQueryPlanTests(TestCase):
+    """
+    Guard the query plans of the most common VerifiedName lookups against regressions
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='planTester', email='plan@tester.com')
+
+    def assert_uses_index(self, queryset, index_name):
+        """
+        Assert that the queryset is resolved with the given index, without sorting rows.
+        """
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_most_recent_verified_name(self):
+        queryset = VerifiedName.objects.filter(user=self.user).order_by('-created')[:1]
+        self.assert_uses_index(queryset, 'nameaff_vn_user_created_idx')
+
+    def test_most_recent_verified_name_with_status(self):
+        queryset = VerifiedName.objects.filter(
+            user=self.user, status=VerifiedNameStatus.APPROVED,
+        ).order_by('-created')[:1]
+        self.assert_uses_index(queryset, 'nameaff_vn_user_status_idx')
+
+    def test_verified_names_for_idv_attempt(self):
+        queryset = VerifiedName.objects.filter(verification_attempt_id=1)
+        self.assert_uses_index(queryset, 'nameaff_vn_idv_attempt_idx')
+
+    def test_verified_names_for_proctored_exam_attempt(self):
+        queryset = VerifiedName.objects.filter(proctored_exam_attempt_id=1)
+        self.assert_uses_index(queryset, 'nameaff_vn_exam_attempt_idx')
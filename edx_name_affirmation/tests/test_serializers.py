@@ -0,0 +1,101 @@
+"""
+Tests for Name Affirmation serializers
+"""
+import os
+import timeit
+from unittest import skipUnless
+from unittest.mock import patch
+
+import ddt
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from edx_name_affirmation.models import VerifiedName
+from edx_name_affirmation.serializers import VerifiedNameSerializer, serialize_verified_names
+from edx_name_affirmation.statuses import VerifiedNameStatus
+
+User = get_user_model()
+
+
+def create_verified_names(user, num_verified_names):
+    """
+    Create VerifiedNames for the user, linked to IDV attempts, proctored exam attempts, or neither.
+    """
+    VerifiedName.objects.bulk_create([
+        VerifiedName(
+            user=user,
+            verified_name=f'Jonathan Doe {index}',
+            profile_name='Jon Doe' if index % 2 else None,
+            verification_attempt_id=index if index % 3 == 0 else None,
+            proctored_exam_attempt_id=index if index % 3 == 1 else None,
+            status=list(VerifiedNameStatus)[index % len(VerifiedNameStatus)].value,
+        )
+        for index in range(num_verified_names)
+    ])
+
+
+def serialize_verified_names_with_model_serializer(verified_name_qs):
+    verified_names = VerifiedName.prefetch_verification_attempt_statuses(verified_name_qs.select_related('user'))
+    return VerifiedNameSerializer(verified_names, many=True).data
+
+
+@patch('edx_name_affirmation.models.SoftwareSecurePhotoVerification')
+class SerializeVerifiedNamesTests(TestCase):
+    """
+    Tests for serialize_verified_names
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='serializerTester', email='serializer@tester.com')
+
+    def test_matches_model_serializer(self, sspv_mock):
+        create_verified_names(self.user, 12)
+        sspv_mock.objects.filter.return_value.values_list.return_value = [(3, 'approved'), (6, 'denied')]
+        verified_name_qs = VerifiedName.objects.filter(user=self.user).order_by('-created', '-id')
+
+        with self.assertNumQueries(1):
+            data = serialize_verified_names(verified_name_qs)
+
+        # the fields must also be in the same order
+        self.assertEqual(
+            [list(row.items()) for row in data],
+            [list(row.items()) for row in serialize_verified_names_with_model_serializer(verified_name_qs)],
+        )
+
+    def test_no_verified_names(self, sspv_mock):
+        with self.assertNumQueries(0):
+            self.assertEqual(serialize_verified_names(VerifiedName.objects.none()), [])
+        sspv_mock.objects.filter.assert_not_called()
+
+
+@skipUnless(os.environ.get('NAME_AFFIRMATION_BENCHMARK'), 'Set NAME_AFFIRMATION_BENCHMARK to run benchmarks')
+@ddt.ddt
+class SerializeVerifiedNamesBenchmark(TestCase):
+    """
+    Compare the time serialize_verified_names and VerifiedNameSerializer take to serialize a history.
+
+    Run with `NAME_AFFIRMATION_BENCHMARK=1 pytest -s edx_name_affirmation/tests/test_serializers.py`.
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='benchmarkTester', email='benchmark@tester.com')
+
+    @ddt.data(1, 100, 10000)
+    def test_benchmark(self, num_verified_names):
+        create_verified_names(self.user, num_verified_names)
+        verified_name_qs = VerifiedName.objects.filter(user=self.user).order_by('-created', '-id')
+        number = max(1, 1000 // num_verified_names)
+
+        model_serializer_seconds = min(timeit.repeat(
+            lambda: serialize_verified_names_with_model_serializer(verified_name_qs), number=number, repeat=5,
+        )) / number
+        values_seconds = min(timeit.repeat(
+            lambda: serialize_verified_names(verified_name_qs), number=number, repeat=5,
+        )) / number
+
+        print(
+            f'\n{num_verified_names} VerifiedNames: VerifiedNameSerializer {model_serializer_seconds * 1000:.3f}ms, '
+            f'serialize_verified_names {values_seconds * 1000:.3f}ms '
+            f'({model_serializer_seconds / values_seconds:.1f}x)'
+        )
@@ -3,14 +3,22 @@ Tests for Name Affirmation tasks
 """
 
 import ddt
-from mock import patch
+from mock import MagicMock, PropertyMock, patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from edx_name_affirmation.models import VerifiedName
+from edx_name_affirmation import tasks
+from edx_name_affirmation.api import get_verified_name, get_verified_name_history, get_verified_names
+from edx_name_affirmation.models import VerifiedName, VerifiedNameUserLock
+from edx_name_affirmation.signals import VERIFIED_NAME_APPROVED
 from edx_name_affirmation.statuses import VerifiedNameStatus
 from edx_name_affirmation.tasks import (
+    bulk_idv_update_verified_names_task,
+    bulk_proctoring_update_verified_names_task,
     delete_verified_name_task,
     idv_update_verified_name_task,
     proctoring_update_verified_name_task
@@ -18,6 +26,16 @@ from edx_name_affirmation.tasks import (
 
 User = get_user_model()
 
+recorded_task_metrics = []
+
+
+def record_task_metrics(task_name, metrics):
+    recorded_task_metrics.append((task_name, metrics))
+
+
+def failing_task_metrics_hook(task_name, metrics):
+    raise ValueError('metrics backend unavailable')
+
 
 @ddt.ddt
 class TaskTests(TestCase):
@@ -34,29 +52,522 @@ class TaskTests(TestCase):
         self.idv_attempt_id = 1111111
         self.proctoring_attempt_id = 2222222
 
-    @patch('edx_name_affirmation.tasks.idv_update_verified_name_task.retry')
-    def test_idv_retry(self, mock_retry):
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    @ddt.data(
+        ('idv_update_verified_name_task', VerifiedNameStatus.SUBMITTED),
+        ('proctoring_update_verified_name_task', VerifiedNameStatus.PENDING),
+    )
+    @ddt.unpack
+    def test_retry_transient_error(self, task_name, status):
+        """
+        Assert that transient database errors are retried with a randomized exponential backoff
+        """
+        task = getattr(tasks, task_name)
+        with patch.object(task, 'retry') as mock_retry, \
+                patch('edx_name_affirmation.tasks.VerifiedName.objects.filter', side_effect=OperationalError):
+            task.delay(
+                self.idv_attempt_id,
+                self.user.id,
+                status,
+                self.verified_name_obj.verified_name,
+                self.verified_name_obj.profile_name,
+            )
+
+        mock_retry.assert_called_once()
+        self.assertIsInstance(mock_retry.call_args.kwargs['exc'], OperationalError)
+        self.assertLessEqual(mock_retry.call_args.kwargs['countdown'], tasks.DEFAULT_RETRY_SECONDS)
+
+    @ddt.data(
+        ('idv_update_verified_name_task', VerifiedNameStatus.SUBMITTED),
+        ('proctoring_update_verified_name_task', VerifiedNameStatus.PENDING),
+    )
+    @ddt.unpack
+    @patch('edx_name_affirmation.tasks.set_custom_attribute')
+    def test_no_retry_permanent_error(self, task_name, status, mock_set_custom_attribute):
+        """
+        Assert that errors which would happen again, such as a missing user, fail the task without retrying
+        """
+        task = getattr(tasks, task_name)
+        with patch.object(task, 'retry') as mock_retry:
+            result = task.delay(
+                self.idv_attempt_id,
+                # force an error with an invalid user ID
+                99999,
+                status,
+                self.verified_name_obj.verified_name,
+                self.verified_name_obj.profile_name,
+            )
+
+        mock_retry.assert_not_called()
+        self.assertIsInstance(result.result, User.DoesNotExist)
+        mock_set_custom_attribute.assert_any_call('name_affirmation_task.failed', True)
+        mock_set_custom_attribute.assert_any_call('name_affirmation_task.error_retriable', False)
+
+    @override_settings(VERIFIED_NAME_TASK_METRICS_HOOK='edx_name_affirmation.tests.test_tasks.record_task_metrics')
+    @patch('edx_name_affirmation.task_metrics.set_custom_attribute')
+    def test_task_metrics(self, mock_set_custom_attribute):
+        """
+        Assert that the queue delay, execution time, query count, branch and rows touched of a task are reported
+        """
+        recorded_task_metrics.clear()
         idv_update_verified_name_task.delay(
             self.idv_attempt_id,
-            # force an error with an invalid user ID
-            99999,
+            self.user.id,
             VerifiedNameStatus.SUBMITTED,
             self.verified_name_obj.verified_name,
             self.verified_name_obj.profile_name,
         )
-        mock_retry.assert_called()
 
-    @patch('edx_name_affirmation.tasks.proctoring_update_verified_name_task.retry')
-    def test_proctoring_retry(self, mock_retry):
-        proctoring_update_verified_name_task.delay(
+        self.assertEqual(len(recorded_task_metrics), 1)
+        task_name, metrics = recorded_task_metrics[0]
+        self.assertEqual(task_name, idv_update_verified_name_task.name)
+        self.assertEqual(metrics['branch'], 'update')
+        # the VerifiedName is linked to the attempt and transitioned to its status by a single write
+        self.assertEqual(metrics['rows'], 1)
+        self.assertEqual(metrics['status'], 'SUCCESS')
+        self.assertGreater(metrics['query_count'], 0)
+        self.assertGreaterEqual(metrics['execution_seconds'], 0)
+        self.assertGreaterEqual(metrics['queue_delay_seconds'], 0)
+        mock_set_custom_attribute.assert_any_call('name_affirmation_task.branch', 'update')
+        mock_set_custom_attribute.assert_any_call('name_affirmation_task.name', idv_update_verified_name_task.name)
+
+    @override_settings(
+        VERIFIED_NAME_TASK_METRICS_HOOK='edx_name_affirmation.tests.test_tasks.failing_task_metrics_hook',
+    )
+    def test_task_metrics_hook_failure(self):
+        """
+        Assert that a failing metrics hook does not fail the task
+        """
+        result = proctoring_update_verified_name_task.delay(
             self.proctoring_attempt_id,
-            # force an error with an invalid user ID
-            99999,
+            self.user.id,
+            VerifiedNameStatus.PENDING,
+            self.verified_name_obj.verified_name,
+            self.verified_name_obj.profile_name,
+        )
+
+        self.assertTrue(result.successful())
+        self.assertTrue(VerifiedName.objects.filter(proctored_exam_attempt_id=self.proctoring_attempt_id).exists())
+
+    def test_idv_update_invalidates_cache(self):
+        """
+        Assert that linking existing VerifiedNames to an IDV attempt invalidates cached lookups
+        """
+        self.assertIsNone(get_verified_name(self.user).verification_attempt_id)
+
+        idv_update_verified_name_task.delay(
+            self.idv_attempt_id,
+            self.user.id,
+            VerifiedNameStatus.SUBMITTED,
+            self.verified_name_obj.verified_name,
+            self.verified_name_obj.profile_name,
+        )
+
+        verified_name_obj = get_verified_name(self.user)
+        self.assertEqual(verified_name_obj.verification_attempt_id, self.idv_attempt_id)
+        self.assertEqual(verified_name_obj.status, VerifiedNameStatus.SUBMITTED)
+
+    def test_idv_update_status_in_bulk(self):
+        """
+        Assert that statuses are updated with a constant number of queries, recording history and sending
+        VERIFIED_NAME_APPROVED only for the VerifiedNames whose status changed
+        """
+        approved_verified_name_obj = VerifiedName.objects.create(
+            user=self.user,
+            verified_name=self.verified_name_obj.verified_name,
+            profile_name=self.verified_name_obj.profile_name,
+            verification_attempt_id=self.idv_attempt_id,
+            status=VerifiedNameStatus.APPROVED,
+        )
+
+        query_counts = []
+        # the first attempt only updates self.verified_name_obj, which has no attempt yet
+        for attempt_id, num_pending in ((self.idv_attempt_id, 1), (self.idv_attempt_id + 1, 4)):
+            for _ in range(num_pending if attempt_id != self.idv_attempt_id else 0):
+                VerifiedName.objects.create(
+                    user=self.user,
+                    verified_name=self.verified_name_obj.verified_name,
+                    profile_name=self.verified_name_obj.profile_name,
+                    verification_attempt_id=attempt_id,
+                )
+
+            with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal, \
+                    self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as queries:
+                    idv_update_verified_name_task.delay(
+                        attempt_id,
+                        self.user.id,
+                        VerifiedNameStatus.APPROVED,
+                        self.verified_name_obj.verified_name,
+                        self.verified_name_obj.profile_name,
+                    )
+
+            self.assertEqual(mock_signal.call_count, num_pending)
+            self.assertEqual(
+                VerifiedName.objects.filter(verification_attempt_id=attempt_id).count(),
+                VerifiedName.objects.filter(
+                    verification_attempt_id=attempt_id, status=VerifiedNameStatus.APPROVED,
+                ).count(),
+            )
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        # the VerifiedName which was already approved is left untouched
+        self.assertEqual(approved_verified_name_obj.history.count(), 1)
+        latest_history = self.verified_name_obj.history.order_by(  # pylint: disable=no-member
+            '-history_date', '-history_id',
+        ).first()
+        self.assertEqual(latest_history.status, VerifiedNameStatus.APPROVED)
+        self.assertEqual(latest_history.history_type, '~')
+
+    @ddt.data(True, False)
+    def test_duplicate_events_skipped(self, is_idv):
+        """
+        Assert that a replayed event is skipped without querying VerifiedNames, until the attempt's VerifiedNames
+        are deleted
+        """
+        attempt_id = self.idv_attempt_id if is_idv else self.proctoring_attempt_id
+        attempt_field = 'verification_attempt_id' if is_idv else 'proctored_exam_attempt_id'
+        update_task = idv_update_verified_name_task if is_idv else proctoring_update_verified_name_task
+
+        def replay_event():
+            # events are only recorded as processed once the task's transaction commits
+            with self.captureOnCommitCallbacks(execute=True):
+                update_task.delay(attempt_id, self.user.id, VerifiedNameStatus.PENDING, 'Jonathan X Doe', 'Jon D')
+
+        replay_event()
+        with CaptureQueriesContext(connection) as queries:
+            replay_event()
+        self.assertFalse([query for query in queries if '"nameaffirmation_verifiedname"' in query['sql']])
+        self.assertEqual(VerifiedName.objects.filter(**{attempt_field: attempt_id}).count(), 1)
+
+        delete_verified_name_task.delay(*((attempt_id, None) if is_idv else (None, attempt_id)))
+        replay_event()
+        self.assertEqual(VerifiedName.objects.filter(**{attempt_field: attempt_id}).count(), 1)
+
+    @override_settings(VERIFIED_NAME_TASK_EVENT_TIMEOUT=0)
+    def test_duplicate_events_not_skipped_when_disabled(self):
+        """
+        Assert that events are always processed when duplicate suppression is disabled
+        """
+        for _ in range(2):
+            proctoring_update_verified_name_task.delay(
+                self.proctoring_attempt_id, self.user.id, VerifiedNameStatus.PENDING, 'Jonathan X Doe', 'Jon D',
+            )
+            VerifiedName.objects.filter(proctored_exam_attempt_id=self.proctoring_attempt_id).update(
+                proctored_exam_attempt_id=None,
+            )
+        self.assertEqual(VerifiedName.objects.filter(verified_name='Jonathan X Doe').count(), 2)
+
+    @patch('edx_name_affirmation.tasks.User.objects.select_for_update')
+    @patch(
+        'edx_name_affirmation.tasks.VerifiedNameUserLock.objects.select_for_update',
+        wraps=VerifiedNameUserLock.objects.select_for_update,
+    )
+    def test_update_locks_user(self, mock_select_for_update, mock_select_user_for_update):
+        """
+        Assert that updates lock the user, so that the updates of a user's attempts run one after the other,
+        without locking the user's own row
+        """
+        with patch('edx_name_affirmation.tasks.transaction.atomic', wraps=transaction.atomic) as mock_atomic:
+            proctoring_update_verified_name_task.delay(
+                self.proctoring_attempt_id, self.user.id, VerifiedNameStatus.PENDING, 'Jonathan X Doe', 'Jon D',
+            )
+
+        mock_atomic.assert_called()
+        mock_select_for_update.assert_called_once_with()
+        mock_select_user_for_update.assert_not_called()
+        self.assertTrue(VerifiedNameUserLock.objects.filter(user_id=self.user.id).exists())
+        self.assertTrue(VerifiedName.objects.filter(proctored_exam_attempt_id=self.proctoring_attempt_id).exists())
+
+    @ddt.data(False, True)
+    def test_bulk_update_locks_users(self, is_idv):
+        """
+        Assert that bulk updates lock their users in a consistent order, without locking the users' own rows
+        """
+        other_user = User.objects.create(username='other_tester', email='other_tester@test.com')
+        VerifiedNameUserLock.objects.create(user_id=self.user.id)
+        bulk_task = bulk_idv_update_verified_names_task if is_idv else bulk_proctoring_update_verified_names_task
+        status = VerifiedNameStatus.SUBMITTED if is_idv else VerifiedNameStatus.PENDING
+
+        with patch('edx_name_affirmation.tasks.User.objects.select_for_update') as mock_select_user_for_update, \
+                CaptureQueriesContext(connection) as queries:
+            bulk_task.delay([
+                (self.idv_attempt_id, other_user.id, status, 'Jane Doe', 'Jane'),
+                (self.idv_attempt_id + 1, self.user.id, status, 'Jonathan Doe', 'Jon Doe'),
+                (self.idv_attempt_id + 2, 99999, status, 'John Doe', 'John'),
+            ])
+
+        mock_select_user_for_update.assert_not_called()
+        self.assertEqual(
+            set(VerifiedNameUserLock.objects.values_list('user_id', flat=True)), {self.user.id, other_user.id},
+        )
+        [lock_query] = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'nameaffirmation_verifiednameuserlock' in query['sql']
+        ]
+        self.assertIn('ORDER BY "nameaffirmation_verifiednameuserlock"."user_id" ASC', lock_query)
+
+    @ddt.data(False, True)
+    def test_idv_update_link_history(self, is_bulk):
+        """
+        Assert that linking a VerifiedName to an attempt records its history, even if its status does not change
+        """
+        modified = self.verified_name_obj.modified
+        update = (
+            self.idv_attempt_id,
+            self.user.id,
             VerifiedNameStatus.PENDING,
             self.verified_name_obj.verified_name,
             self.verified_name_obj.profile_name,
         )
-        mock_retry.assert_called()
+        if is_bulk:
+            bulk_idv_update_verified_names_task.delay([update])
+        else:
+            idv_update_verified_name_task.delay(*update)
+
+        self.verified_name_obj.refresh_from_db()
+        self.assertEqual(self.verified_name_obj.verification_attempt_id, self.idv_attempt_id)
+        self.assertEqual(self.verified_name_obj.status, VerifiedNameStatus.PENDING)
+        self.assertGreater(self.verified_name_obj.modified, modified)
+        self.assertEqual(
+            list(
+                self.verified_name_obj.history.order_by(  # pylint: disable=no-member
+                    'history_date', 'history_id',
+                ).values_list('history_type', 'verification_attempt_id', 'status', 'modified')
+            ),
+            [
+                ('+', None, VerifiedNameStatus.PENDING, modified),
+                ('~', self.idv_attempt_id, VerifiedNameStatus.PENDING, self.verified_name_obj.modified),
+            ],
+        )
+
+    def test_bulk_idv_update(self):
+        """
+        Assert that the bulk task applies the latest update of each attempt as idv_update_verified_name_task would
+        """
+        other_user = User.objects.create(username='other_tester', email='other_tester@test.com')
+        proctored_verified_name_obj = VerifiedName.objects.create(
+            user=self.user,
+            verified_name=self.verified_name_obj.verified_name,
+            profile_name=self.verified_name_obj.profile_name,
+            proctored_exam_attempt_id=self.proctoring_attempt_id,
+        )
+        other_attempt_id = self.idv_attempt_id + 1
+
+        with patch('edx_name_affirmation.signals.VERIFIED_NAME_APPROVED.send') as mock_signal, \
+                self.captureOnCommitCallbacks(execute=True):
+            bulk_idv_update_verified_names_task.delay([
+                # links and approves the existing VerifiedName
+                (self.idv_attempt_id, self.user.id, VerifiedNameStatus.SUBMITTED, 'Jonathan Doe', 'Jon Doe'),
+                (self.idv_attempt_id, self.user.id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe'),
+                # creates a VerifiedName, ignoring the stale update that follows
+                (other_attempt_id, other_user.id, VerifiedNameStatus.SUBMITTED, 'Jane Doe', 'Jane'),
+                (other_attempt_id, other_user.id, VerifiedNameStatus.PENDING, 'Jane Doe', 'Jane'),
+                # skipped, since the user does not exist
+                (other_attempt_id + 1, 99999, VerifiedNameStatus.APPROVED, 'John Doe', 'John'),
+            ])
+
+        self.verified_name_obj.refresh_from_db()
+        self.assertEqual(self.verified_name_obj.verification_attempt_id, self.idv_attempt_id)
+        self.assertEqual(self.verified_name_obj.status, VerifiedNameStatus.APPROVED)
+        mock_signal.assert_called_once_with(
+            sender='name_affirmation', user_id=self.user.id, profile_name='Jon Doe',
+        )
+        proctored_verified_name_obj.refresh_from_db()
+        self.assertIsNone(proctored_verified_name_obj.verification_attempt_id)
+        self.assertEqual(proctored_verified_name_obj.status, VerifiedNameStatus.PENDING)
+
+        created_verified_name_obj = VerifiedName.objects.get(user=other_user)
+        self.assertEqual(created_verified_name_obj.verification_attempt_id, other_attempt_id)
+        self.assertEqual(created_verified_name_obj.status, VerifiedNameStatus.SUBMITTED)
+        self.assertEqual(created_verified_name_obj.history.count(), 1)
+        self.assertEqual(get_verified_name(other_user), created_verified_name_obj)
+        self.assertEqual(VerifiedName.objects.count(), 3)
+
+    def test_bulk_idv_update_same_created(self):
+        """
+        Assert that VerifiedNames created for a user in the same batch are ordered the same way by every lookup
+        """
+        other_user = User.objects.create(username='other_tester', email='other_tester@test.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_idv_update_verified_names_task.delay([
+                (self.idv_attempt_id, other_user.id, VerifiedNameStatus.SUBMITTED, 'Jane Doe', 'Jane'),
+                (self.idv_attempt_id + 1, other_user.id, VerifiedNameStatus.SUBMITTED, 'Janet Doe', 'Jane'),
+            ])
+
+        first_verified_name, second_verified_name = VerifiedName.objects.filter(user=other_user).order_by('id')
+        self.assertEqual(first_verified_name.created, second_verified_name.created)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_verified_name(other_user), second_verified_name)
+            self.assertEqual(get_verified_names([other_user.id])[other_user.id], second_verified_name)
+            self.assertEqual(list(get_verified_name_history(other_user)), [second_verified_name, first_verified_name])
+        # the order of rows created at the same time is up to the database unless their ids break the tie
+        for query in queries:
+            self.assertNotRegex(query['sql'], r'"created" DESC(?!, [\w."]*"id" DESC)')
+
+    @ddt.data(True, False)
+    def test_bulk_idv_update_queries(self, can_return_rows_from_bulk_insert):
+        """
+        Assert that the number of queries run by the bulk task does not depend on the number of updates,
+        including on databases which cannot return the ids of rows created in bulk
+        """
+        query_counts = []
+        for num_users in (1, 20):
+            updates = []
+            for _ in range(num_users):
+                user = User.objects.create(username=f'tester_{User.objects.count()}')
+                VerifiedName.objects.create(user=user, verified_name='Jane Doe', profile_name='Jane')
+                updates.append((user.id, user.id, VerifiedNameStatus.APPROVED, 'Jane Doe', 'Jane'))
+                updates.append((user.id + 1000, user.id, VerifiedNameStatus.SUBMITTED, 'Janet Doe', 'Jane'))
+
+            with CaptureQueriesContext(connection) as queries, patch.object(
+                type(connection.features), 'can_return_rows_from_bulk_insert',
+                new_callable=PropertyMock, return_value=can_return_rows_from_bulk_insert,
+            ):
+                bulk_idv_update_verified_names_task.delay(updates)
+            query_counts.append(len(queries))
+
+            verified_names = VerifiedName.objects.filter(verification_attempt_id__in=[update[0] for update in updates])
+            self.assertEqual(verified_names.count(), num_users * 2)
+            # each created VerifiedName has its own creation history record
+            self.assertEqual(
+                set(
+                    VerifiedName.history.filter(  # pylint: disable=no-member
+                        history_type='+', verification_attempt_id__in=[update[0] for update in updates[1::2]],
+                    ).values_list('id', 'verification_attempt_id')
+                ),
+                set(verified_names.filter(verified_name='Janet Doe').values_list('id', 'verification_attempt_id')),
+            )
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    @ddt.data(True, False)
+    def test_bulk_proctoring_update_queries(self, can_return_rows_from_bulk_insert):
+        """
+        Assert that the number of queries run by the bulk proctoring task does not depend on the number of updates,
+        including on databases which cannot return the ids of rows created in bulk
+        """
+        query_counts = []
+        for num_users in (1, 20):
+            updates = []
+            for _ in range(num_users):
+                user = User.objects.create(username=f'tester_{User.objects.count()}')
+                verified_name = VerifiedName.objects.create(
+                    user=user, verified_name='Jane Doe', profile_name='Jane', proctored_exam_attempt_id=user.id,
+                )
+                updates.append((verified_name.proctored_exam_attempt_id, user.id, VerifiedNameStatus.DENIED,
+                                'Jane Doe', 'Jane'))
+                updates.append((user.id + 1000, user.id, VerifiedNameStatus.SUBMITTED, 'Janet Doe', 'Jane'))
+
+            with CaptureQueriesContext(connection) as queries, patch.object(
+                type(connection.features), 'can_return_rows_from_bulk_insert',
+                new_callable=PropertyMock, return_value=can_return_rows_from_bulk_insert,
+            ):
+                bulk_proctoring_update_verified_names_task.delay(updates)
+            query_counts.append(len(queries))
+
+            created_verified_names = VerifiedName.objects.filter(
+                proctored_exam_attempt_id__in=[update[0] for update in updates[1::2]],
+            )
+            self.assertEqual(
+                set(
+                    VerifiedName.history.filter(  # pylint: disable=no-member
+                        history_type='+', proctored_exam_attempt_id__in=[update[0] for update in updates[1::2]],
+                    ).values_list('id', 'proctored_exam_attempt_id')
+                ),
+                set(created_verified_names.values_list('id', 'proctored_exam_attempt_id')),
+            )
+
+            self.assertEqual(
+                VerifiedName.objects.filter(
+                    proctored_exam_attempt_id__in=[update[0] for update in updates],
+                    status__in=[VerifiedNameStatus.DENIED, VerifiedNameStatus.SUBMITTED],
+                ).count(),
+                num_users * 2,
+            )
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_bulk_proctoring_update_denied_approved_name(self):
+        """
+        Assert that a name approved and then denied within a batch no longer counts as the user's approved name
+        """
+        single_user = User.objects.create(username='single_tester', email='single_tester@test.com')
+        bulk_user = User.objects.create(username='bulk_tester', email='bulk_tester@test.com')
+        statuses = [(1, VerifiedNameStatus.APPROVED), (1, VerifiedNameStatus.DENIED), (2, VerifiedNameStatus.PENDING)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for attempt_id, status in statuses:
+                proctoring_update_verified_name_task.delay(attempt_id, single_user.id, status, 'Jane Doe', 'Jane')
+            bulk_proctoring_update_verified_names_task.delay([
+                (attempt_id + 10, bulk_user.id, status, 'Jane Doe', 'Jane') for attempt_id, status in statuses
+            ])
+
+        self.assertEqual(
+            list(single_user.verifiedname_set.order_by('proctored_exam_attempt_id').values_list(
+                'proctored_exam_attempt_id', 'status',
+            )),
+            [(1, VerifiedNameStatus.DENIED), (2, VerifiedNameStatus.PENDING)],
+        )
+        self.assertEqual(
+            list(bulk_user.verifiedname_set.order_by('proctored_exam_attempt_id').values_list(
+                'proctored_exam_attempt_id', 'status',
+            )),
+            [(11, VerifiedNameStatus.DENIED), (12, VerifiedNameStatus.PENDING)],
+        )
+
+    def test_idv_update_resolves_names(self):
+        """
+        Assert that the names of an update sent without them are resolved from the attempt and the user
+        """
+        mock_photo_verification_model = MagicMock()
+        mock_photo_verification_model.objects.filter.return_value.values_list.return_value = [
+            (self.idv_attempt_id, 'Jonathan X Doe'),
+        ]
+        mock_profile_model = MagicMock()
+        mock_profile_model.objects.filter.return_value.values_list.return_value = [(self.user.id, 'Jon D')]
+        mock_pending_name_change_model = MagicMock()
+        mock_pending_name_change_model.objects.filter.return_value.values_list.return_value = [
+            (self.user.id, 'Jonathan D'),
+        ]
+
+        with patch.multiple(
+            'edx_name_affirmation.name_resolution',
+            SoftwareSecurePhotoVerification=mock_photo_verification_model,
+            UserProfile=mock_profile_model,
+            PendingNameChange=mock_pending_name_change_model,
+        ):
+            idv_update_verified_name_task.delay(
+                self.idv_attempt_id, self.user.id, VerifiedNameStatus.SUBMITTED, None, None,
+            )
+            proctoring_update_verified_name_task.delay(
+                self.proctoring_attempt_id, self.user.id, VerifiedNameStatus.SUBMITTED, None, None,
+            )
+
+        idv_verified_name_obj = VerifiedName.objects.get(verification_attempt_id=self.idv_attempt_id)
+        self.assertEqual(idv_verified_name_obj.verified_name, 'Jonathan X Doe')
+        self.assertEqual(idv_verified_name_obj.profile_name, 'Jonathan D')
+        proctoring_verified_name_obj = VerifiedName.objects.get(proctored_exam_attempt_id=self.proctoring_attempt_id)
+        self.assertEqual(proctoring_verified_name_obj.verified_name, 'Jon D')
+        self.assertEqual(proctoring_verified_name_obj.profile_name, 'Jon D')
+        mock_photo_verification_model.objects.filter.assert_called_once_with(id__in={self.idv_attempt_id})
+
+    @patch('logging.Logger.error')
+    def test_idv_update_unresolved_names(self, mock_logger):
+        """
+        Assert that an update sent without names is not applied if the names cannot be resolved
+        """
+        idv_update_verified_name_task.delay(self.idv_attempt_id, self.user.id, VerifiedNameStatus.SUBMITTED, None, None)
+        bulk_idv_update_verified_names_task.delay(
+            [(self.idv_attempt_id, self.user.id, VerifiedNameStatus.SUBMITTED, None, None)],
+        )
+
+        self.assertEqual(mock_logger.call_count, 2)
+        self.assertFalse(VerifiedName.objects.filter(verification_attempt_id=self.idv_attempt_id).exists())
 
     def test_idv_delete(self):
         """
@@ -94,6 +605,46 @@ class TaskTests(TestCase):
         self.assertEqual(len(VerifiedName.objects.filter(verification_attempt_id=self.idv_attempt_id)), 0)
         self.assertEqual(len(VerifiedName.objects.filter(verification_attempt_id=other_attempt_id)), 1)
 
+    @patch('edx_name_affirmation.tasks.DELETE_BATCH_SIZE', 2)
+    def test_idv_delete_in_batches(self):
+        """
+        Assert that VerifiedNames are deleted in batches, recording their history and invalidating cached lookups
+        """
+        for _ in range(5):
+            VerifiedName.objects.create(
+                user=self.user,
+                verified_name='Jonathan X Doe',
+                profile_name='Jon D',
+                verification_attempt_id=self.idv_attempt_id
+            )
+        self.assertEqual(get_verified_name(self.user).verification_attempt_id, self.idv_attempt_id)
+
+        with patch('logging.Logger.info') as mock_logger:
+            delete_verified_name_task.delay(self.idv_attempt_id, None)
+
+        mock_logger.assert_called_with(
+            'Deleted 5 VerifiedName(s) associated with verification_attempt_id={}'.format(self.idv_attempt_id)
+        )
+        self.assertFalse(VerifiedName.objects.filter(verification_attempt_id=self.idv_attempt_id).exists())
+        deletion_history = VerifiedName.history.filter(history_type='-')  # pylint: disable=no-member
+        self.assertEqual(deletion_history.count(), 5)
+        self.assertEqual(
+            set(deletion_history.values_list('verified_name', 'verification_attempt_id', 'user_id')),
+            {('Jonathan X Doe', self.idv_attempt_id, self.user.id)},
+        )
+        self.assertEqual(get_verified_name(self.user), self.verified_name_obj)
+
+    def test_verified_name_has_no_dependent_relations(self):
+        """
+        Assert that no rows can depend on a VerifiedName, since delete_verified_name_task deletes
+        VerifiedNames without cascading to them
+        """
+        dependent_relations = [
+            field for field in VerifiedName._meta.get_fields(include_hidden=True)
+            if field.many_to_many or (field.auto_created and not field.concrete)
+        ]
+        self.assertEqual(dependent_relations, [])
+
     def test_proctoring_delete(self):
         """
         Assert that only relevant VerifiedNames are deleted for a given proctoring_attempt_id
@@ -155,3 +706,54 @@ class TaskTests(TestCase):
         mock_logger.assert_called_with(
             'No VerifiedNames deleted because no VerifiedNames were associated with the provided attempt ID.'
         )
+
+
+@ddt.ddt
+class ApprovedSignalTests(TransactionTestCase):
+    """
+    Tests for the VERIFIED_NAME_APPROVED signals sent by the tasks, across real transactions
+    """
+    def setUp(self):
+        self.user = User.objects.create(username='tester', email='tester@test.com')
+        self.attempt_id = 1111111
+        self.received_signals = []
+        VERIFIED_NAME_APPROVED.connect(self._receive_signal)
+        self.addCleanup(VERIFIED_NAME_APPROVED.disconnect, self._receive_signal)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def _receive_signal(self, user_id, **kwargs):
+        self.received_signals.append({
+            'in_atomic_block': connection.in_atomic_block,
+            'is_approved': VerifiedName.objects.filter(user_id=user_id, status=VerifiedNameStatus.APPROVED).exists(),
+        })
+
+    @ddt.data(
+        ('idv_update_verified_name_task', None),
+        ('idv_update_verified_name_task', VerifiedNameStatus.SUBMITTED),
+        ('proctoring_update_verified_name_task', None),
+        ('proctoring_update_verified_name_task', VerifiedNameStatus.SUBMITTED),
+    )
+    @ddt.unpack
+    def test_signal_sent_after_commit(self, task_name, existing_status):
+        """
+        Assert that VERIFIED_NAME_APPROVED is only sent once the approved VerifiedName is committed, whether
+        the VerifiedName is created or transitioned
+        """
+        attempt_field = 'verification_attempt_id' if task_name.startswith('idv') else 'proctored_exam_attempt_id'
+        if existing_status:
+            VerifiedName.objects.create(
+                user=self.user,
+                verified_name='Jonathan Doe',
+                profile_name='Jon Doe',
+                status=existing_status,
+                **{attempt_field: self.attempt_id},
+            )
+
+        getattr(tasks, task_name).delay(
+            self.attempt_id, self.user.id, VerifiedNameStatus.APPROVED, 'Jonathan Doe', 'Jon Doe',
+        )
+
+        self.assertEqual(self.received_signals, [{'in_atomic_block': False, 'is_approved': True}])
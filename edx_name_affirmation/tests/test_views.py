@@ -2,12 +2,15 @@
 All tests for edx_name_affirmation views
 """
 import json
-from unittest.mock import PropertyMock, patch
+from unittest.mock import patch
 
 import ddt
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from edx_name_affirmation.api import (
@@ -36,8 +39,9 @@ class NameAffirmationViewsTestCase(LoggedInTestCase):
         self.other_user = User(username='other_tester', email='other@test.com')
         self.other_user.save()
         # Create fresh configs with default values
-        VerifiedNameConfig.objects.create(user=self.user)
-        VerifiedNameConfig.objects.create(user=self.other_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            VerifiedNameConfig.objects.create(user=self.user)
+            VerifiedNameConfig.objects.create(user=self.other_user)
 
     def tearDown(self):
         super().tearDown()
@@ -105,6 +109,61 @@ class VerifiedNameViewTests(NameAffirmationViewsTestCase):
         data = json.loads(response.content.decode('utf-8'))
         self.assertEqual(data, expected_data)
 
+    def test_verified_name_not_modified(self):
+        self._create_verified_name(self.user, status=VerifiedNameStatus.APPROVED)
+        response = self.client.get(reverse('edx_name_affirmation:verified_name'))
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('edx_name_affirmation:verified_name'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse([query for query in queries if 'nameaffirmation' in query['sql']])
+
+        # a new config changes the response, so the ETag no longer matches
+        create_verified_name_config(self.user, use_verified_name_for_certs=True)
+        response = self.client.get(reverse('edx_name_affirmation:verified_name'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertTrue(json.loads(response.content.decode('utf-8'))['use_verified_name_for_certs'])
+
+    @override_settings(VERIFIED_NAME_CACHE_RESPONSES=True)
+    def test_verified_name_cached_response(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            verified_name = self._create_verified_name(self.user, status=VerifiedNameStatus.APPROVED)
+        expected_data = self._get_expected_data(self.user, verified_name)
+        self.client.get(reverse('edx_name_affirmation:verified_name'))
+
+        with CaptureQueriesContext(connection) as queries, \
+                patch('edx_name_affirmation.views.VerifiedNameSerializer') as mock_serializer:
+            response = self.client.get(reverse('edx_name_affirmation:verified_name'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), expected_data)
+        self.assertFalse([query for query in queries if 'nameaffirmation' in query['sql']])
+        mock_serializer.assert_not_called()
+
+        # a new config invalidates the cached response
+        create_verified_name_config(self.user, use_verified_name_for_certs=True)
+        response = self.client.get(reverse('edx_name_affirmation:verified_name'))
+        self.assertTrue(json.loads(response.content.decode('utf-8'))['use_verified_name_for_certs'])
+
+    def test_verified_name_etag_checked_after_permissions(self):
+        self._create_verified_name(self.other_user, status=VerifiedNameStatus.APPROVED)
+        self.user.is_staff = True
+        self.user.save()
+        etag = self.client.get(
+            reverse('edx_name_affirmation:verified_name'), {'username': self.other_user.username},
+        )['ETag']
+
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(
+            reverse('edx_name_affirmation:verified_name'),
+            {'username': self.other_user.username},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 403)
+
     def test_404_if_no_verified_name(self):
         response = self.client.get(reverse('edx_name_affirmation:verified_name'))
         self.assertEqual(response.status_code, 404)
@@ -381,24 +440,50 @@ class VerifiedNameHistoryViewTests(NameAffirmationViewsTestCase):
         data = json.loads(response.content.decode('utf-8'))
         self.assertEqual(data, expected_response)
 
-    @patch('edx_name_affirmation.api.VerifiedName.verification_attempt_status', new_callable=PropertyMock)
-    def test_get_with_idv_status(self, verification_attempt_status_mock):
+    @ddt.data({}, {'page_size': 10})
+    @patch('edx_name_affirmation.models.SoftwareSecurePhotoVerification')
+    def test_get_with_idv_status(self, params, sspv_mock):
         mocked_idv_status = 'approved'
 
-        verification_attempt_status_mock.return_value = mocked_idv_status
         verified_name_history = self._create_verified_name_history(self.user)
+        sspv_mock.objects.filter.return_value.values_list.return_value = [(123, mocked_idv_status)]
         expected_response = self._get_expected_response(self.user, verified_name_history)
 
-        # replacing the expected response results with the mocked status
+        # replacing the expected response results with the mocked status of the IDV attempt
         for row in expected_response['results']:
-            row['verification_attempt_status'] = mocked_idv_status
+            if row['verification_attempt_id'] == 123:
+                row['verification_attempt_status'] = mocked_idv_status
 
-        response = self.client.get(reverse('edx_name_affirmation:verified_name_history'))
+        response = self.client.get(reverse('edx_name_affirmation:verified_name_history'), params)
 
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.content.decode('utf-8'))
+        data.pop('next_cursor', None)
 
         self.assertEqual(data, expected_response)
+        sspv_mock.objects.filter.assert_called_once_with(id__in={123})
+
+    @patch('edx_name_affirmation.models.SoftwareSecurePhotoVerification')
+    def test_get_query_count(self, sspv_mock):
+        """
+        The number of queries should not grow with the number of verified names in the history.
+        """
+        sspv_mock.objects.filter.return_value.values_list.return_value = []
+        self._create_verified_name_history(self.user)
+        # warm up the configuration cache, so that both measured requests start from the same state
+        self.client.get(reverse('edx_name_affirmation:verified_name_history'))
+        self._create_verified_name_history(self.user)
+        with CaptureQueriesContext(connection) as short_history_queries:
+            self.client.get(reverse('edx_name_affirmation:verified_name_history'))
+
+        self._create_verified_name_history(self.user)
+        with CaptureQueriesContext(connection) as long_history_queries:
+            response = self.client.get(reverse('edx_name_affirmation:verified_name_history'))
+
+        self.assertEqual(len(json.loads(response.content.decode('utf-8'))['results']), 6)
+        self.assertEqual(len(long_history_queries), len(short_history_queries))
+        self.assertEqual(sspv_mock.objects.filter.call_count, 3)
+        sspv_mock.objects.get.assert_not_called()
 
     def test_get_bools(self):
         verified_name_history = self._create_verified_name_history(self.user)
@@ -421,6 +506,74 @@ class VerifiedNameHistoryViewTests(NameAffirmationViewsTestCase):
         data = json.loads(response.content.decode('utf-8'))
         self.assertEqual(data, expected_response)
 
+    def test_get_paginated(self):
+        verified_name_history = self._create_verified_name_history(self.user)
+        expected_response = self._get_expected_response(self.user, verified_name_history)
+
+        response = self.client.get(reverse('edx_name_affirmation:verified_name_history'), {'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        first_page = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(first_page['results'], expected_response['results'][:1])
+        self.assertIsNotNone(first_page['next_cursor'])
+
+        response = self.client.get(
+            reverse('edx_name_affirmation:verified_name_history'),
+            {'page_size': 1, 'cursor': first_page['next_cursor']},
+        )
+        self.assertEqual(response.status_code, 200)
+        second_page = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(second_page['results'], expected_response['results'][1:])
+        self.assertIsNone(second_page['next_cursor'])
+        self.assertEqual(second_page['use_verified_name_for_certs'], False)
+
+    def test_get_not_modified(self):
+        self._create_verified_name_history(self.user)
+        response = self.client.get(reverse('edx_name_affirmation:verified_name_history'))
+        etag = response['ETag']
+
+        response = self.client.get(reverse('edx_name_affirmation:verified_name_history'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # each page of the history has its own ETag
+        response = self.client.get(
+            reverse('edx_name_affirmation:verified_name_history'), {'page_size': 1}, HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # a new verified name changes the history, so the ETag no longer matches
+        create_verified_name(self.user, 'Jonathan Doe', 'Jon Doe')
+        response = self.client.get(reverse('edx_name_affirmation:verified_name_history'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content.decode('utf-8'))['results']), 3)
+
+    @override_settings(VERIFIED_NAME_CACHE_RESPONSES=True)
+    def test_get_cached_response(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            verified_name_history = self._create_verified_name_history(self.user)
+        expected_response = self._get_expected_response(self.user, verified_name_history)
+        self.client.get(reverse('edx_name_affirmation:verified_name_history'))
+        self.client.get(reverse('edx_name_affirmation:verified_name_history'), {'page_size': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('edx_name_affirmation:verified_name_history'))
+            page_response = self.client.get(reverse('edx_name_affirmation:verified_name_history'), {'page_size': 1})
+        self.assertEqual(json.loads(response.content.decode('utf-8')), expected_response)
+        self.assertEqual(
+            json.loads(page_response.content.decode('utf-8'))['results'], expected_response['results'][:1],
+        )
+        self.assertFalse([query for query in queries if 'nameaffirmation' in query['sql']])
+
+        # a new verified name invalidates the cached responses
+        create_verified_name(self.user, 'Jonathan Doe', 'Jon Doe')
+        response = self.client.get(reverse('edx_name_affirmation:verified_name_history'))
+        self.assertEqual(len(json.loads(response.content.decode('utf-8'))['results']), 3)
+
+    @ddt.data({'page_size': 'abc'}, {'page_size': '0'}, {'cursor': 'not a cursor'})
+    def test_get_paginated_invalid(self, params):
+        response = self.client.get(reverse('edx_name_affirmation:verified_name_history'), params)
+        self.assertEqual(response.status_code, 400)
+
     @ddt.data((True, 200), (False, 403))
     @ddt.unpack
     def test_get_staff_access(self, is_staff, expected_response):
@@ -486,6 +639,103 @@ class VerifiedNameHistoryViewTests(NameAffirmationViewsTestCase):
         return expected_response
 
 
+@ddt.ddt
+class VerifiedNameBulkViewTests(NameAffirmationViewsTestCase):
+    """
+    Tests for the VerifiedNameBulkView
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = True
+        self.user.save()
+
+    def test_post(self):
+        create_verified_name(self.user, 'Jonathan Doe', 'Jon Doe', status=VerifiedNameStatus.APPROVED)
+        create_verified_name(self.user, 'Jonathan X Doe', 'Jon Doe', status=VerifiedNameStatus.PENDING)
+        create_verified_name(self.other_user, 'Robert Smith', 'Bob Smith', status=VerifiedNameStatus.APPROVED)
+        create_verified_name_config(self.other_user, use_verified_name_for_certs=True)
+        user_without_names = User(username='no_names', email='no_names@test.com')
+        user_without_names.save()
+
+        response = self.client.post(
+            reverse('edx_name_affirmation:verified_names_bulk'),
+            {'usernames': [self.user.username, 'unknown'], 'user_ids': [self.other_user.id, user_without_names.id]},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data['results'], [
+            self._get_expected_data(self.user, False),
+            self._get_expected_data(self.other_user, True),
+        ])
+
+    def test_post_query_count(self):
+        """
+        The number of queries should not grow with the number of users requested.
+        """
+        users = [self.user, self.other_user]
+        for index in range(4):
+            user = User(username=f'user{index}', email=f'user{index}@test.com')
+            user.save()
+            users.append(user)
+        for user in users:
+            create_verified_name(user, 'Jonathan Doe', 'Jon Doe', status=VerifiedNameStatus.APPROVED)
+
+        query_counts = []
+        for num_users in (2, 6):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse('edx_name_affirmation:verified_names_bulk'),
+                    {'usernames': [user.username for user in users[:num_users]]},
+                    content_type='application/json',
+                )
+            self.assertEqual(len(json.loads(response.content.decode('utf-8'))['results']), num_users)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_post_403_non_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+
+        response = self.client.post(
+            reverse('edx_name_affirmation:verified_names_bulk'),
+            {'usernames': [self.other_user.username]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    @ddt.data({}, {'usernames': []}, {'user_ids': ['abc']}, {'usernames': ['a', 'b'], 'user_ids': [1]})
+    @override_settings(VERIFIED_NAME_BULK_MAX_USERS=2)
+    def test_post_400(self, request_data):
+        response = self.client.post(
+            reverse('edx_name_affirmation:verified_names_bulk'),
+            request_data,
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def _get_expected_data(self, user, use_verified_name_for_certs):
+        """
+        Create a dictionary of expected data for the approved verified name of the user.
+        """
+        verified_name_obj = get_verified_name(user, is_verified=True)
+        return {
+            'id': verified_name_obj.id,
+            'created': verified_name_obj.created.isoformat(),
+            'username': user.username,
+            'verified_name': verified_name_obj.verified_name,
+            'profile_name': verified_name_obj.profile_name,
+            'verification_attempt_id': verified_name_obj.verification_attempt_id,
+            'verification_attempt_status': None,
+            'proctored_exam_attempt_id': verified_name_obj.proctored_exam_attempt_id,
+            'status': verified_name_obj.status,
+            'use_verified_name_for_certs': use_verified_name_for_certs,
+        }
+
+
 class VerifiedNameConfigViewTests(NameAffirmationViewsTestCase):
     """
     Tests for the VerifiedNameConfigView
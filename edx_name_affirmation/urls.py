@@ -29,5 +29,10 @@ urlpatterns = [
         name='verified_name_config'
     ),
 
+    path(
+        'edx_name_affirmation/v1/verified_names/bulk', views.VerifiedNameBulkView.as_view(),
+        name='verified_names_bulk'
+    ),
+
     path('', include('rest_framework.urls', namespace='rest_framework')),
 ]
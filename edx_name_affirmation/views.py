@@ -1,6 +1,8 @@
 """
 Name Affirmation HTTP-based API endpoints
 """
+import hashlib
+
 from edx_api_doc_tools import path_parameter, query_parameter, schema
 from edx_rest_framework_extensions.auth.jwt.authentication import JwtAuthentication
 from rest_framework import status as http_status
@@ -10,25 +12,40 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
 
 from edx_name_affirmation.api import (
     create_verified_name,
     create_verified_name_config,
     delete_verified_name,
     get_verified_name,
+    get_verified_name_configs,
     get_verified_name_history,
+    get_verified_name_history_page,
+    get_verified_names,
     should_use_verified_name_for_certs,
     update_verified_name_status
 )
+from edx_name_affirmation.caching import (
+    get_user_cache_version,
+    get_user_values,
+    is_response_cache_enabled,
+    set_user_values
+)
 from edx_name_affirmation.exceptions import (
     VerifiedNameAttemptIdNotGiven,
     VerifiedNameDoesNotExist,
+    VerifiedNameHistoryInvalidCursor,
     VerifiedNameMultipleAttemptIds
 )
+from edx_name_affirmation.models import VerifiedName
 from edx_name_affirmation.serializers import (
+    BulkVerifiedNameRequestSerializer,
     UpdateVerifiedNameSerializer,
     VerifiedNameConfigSerializer,
-    VerifiedNameSerializer
+    VerifiedNameSerializer,
+    serialize_verified_names
 )
 from edx_name_affirmation.statuses import VerifiedNameStatus
 
@@ -41,6 +58,51 @@ class AuthenticatedAPIView(APIView):
     permission_classes = (IsAuthenticated,)
 
 
+def _get_cached_response_data(user, response_name):
+    """
+    Return the given user's cache version, and the data of the response cached for them as `response_name`.
+
+    The data is None if the response is not cached or the response cache is disabled. The version must
+    be read before the data of a response is, so that a change made in between leaves the response
+    cached under, and tagged with, an outdated version.
+    """
+    if not is_response_cache_enabled():
+        return get_user_cache_version(user.id), None
+    version, cached_values = get_user_values(user.id, [response_name])
+    return version, cached_values.get(response_name)
+
+
+def _cache_response(user, version, response_name, response):
+    """
+    Cache the data of the given successful response for the user as `response_name`, if the response
+    cache is enabled. Users without a VerifiedName are already answered from the cache.
+    """
+    if is_response_cache_enabled():
+        set_user_values(user.id, version, {response_name: response.data})
+
+
+def _get_user_etag(user, version, response_name):
+    """
+    Return the ETag of a response built from the given user's VerifiedNames and VerifiedNameConfig.
+
+    The ETag is derived from the user's cache version, which is replaced whenever their VerifiedNames
+    or VerifiedNameConfig change, and from the `response_name` identifying the response, including
+    its query parameters.
+    """
+    key = f'{user.id}:{version}:{response_name}'
+    return '"{}"'.format(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+
+def _get_not_modified_response(request, etag):
+    """
+    Return a 304 response if the request's If-None-Match header matches the given ETag, or None if not.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
+
+
 class VerifiedNameView(AuthenticatedAPIView):
     """
     Endpoint for a VerifiedName.
@@ -83,6 +145,16 @@ class VerifiedNameView(AuthenticatedAPIView):
             )
 
         user = get_user_model().objects.get(username=username) if username else request.user
+        response_name = 'response.verified_name'
+        version, cached_data = _get_cached_response_data(user, response_name)
+        etag = _get_user_etag(user, version, response_name)
+        not_modified_response = _get_not_modified_response(request, etag)
+        if not_modified_response is not None:
+            return not_modified_response
+
+        if cached_data is not None:
+            return Response(cached_data, headers={'ETag': etag})
+
         verified_name = get_verified_name(user, is_verified=True)
         if verified_name is None:
             return Response(
@@ -92,7 +164,9 @@ class VerifiedNameView(AuthenticatedAPIView):
 
         serialized_data = VerifiedNameSerializer(verified_name).data
         serialized_data['use_verified_name_for_certs'] = should_use_verified_name_for_certs(user)
-        return Response(serialized_data)
+        response = Response(serialized_data, headers={'ETag': etag})
+        _cache_response(user, version, response_name, response)
+        return response
 
     @schema(
         body=VerifiedNameSerializer(),
@@ -231,19 +305,26 @@ class VerifiedNameHistoryView(AuthenticatedAPIView):
 
     Supports:
         HTTP GET: Return a list of VerifiedNames for the given user.
+
+    The history is paginated if either `page_size` or `cursor` is given, in which case the
+    response also contains the `next_cursor` to request the following page with.
     """
     @schema(
         parameters=[
             query_parameter('username', str, 'The username of which verified name records might be associated'),
+            query_parameter('page_size', int, 'The number of verified name records to return per page'),
+            query_parameter('cursor', str, 'The next_cursor returned with the previous page'),
         ],
         responses={
             200: 'The verified_name record associated with the username provided is successfully edited',
+            400: 'The page_size or cursor provided is invalid',
             403: 'User lacks required permission. Only an edX staff user can invoke this API',
         },
     )
     def get(self, request):
         """
         Get a list of verified name objects for the given user, ordered by most recently created.
+        For example: /edx_name_affirmation/v1/verified_name/history?username=jdoe&page_size=10
         """
         username = request.GET.get('username')
         if username and not request.user.is_staff:
@@ -253,15 +334,124 @@ class VerifiedNameHistoryView(AuthenticatedAPIView):
             )
 
         user = get_user_model().objects.get(username=username) if username else request.user
-        verified_name_qs = get_verified_name_history(user)
-        serializer = VerifiedNameSerializer(verified_name_qs, many=True)
+
+        is_paginated = 'page_size' in request.GET or 'cursor' in request.GET
+        page_size = request.GET.get('page_size')
+        if is_paginated and page_size is not None and not (page_size.isdigit() and int(page_size) > 0):
+            return Response(
+                status=http_status.HTTP_400_BAD_REQUEST,
+                data={'detail': 'The page_size must be a positive integer.'}
+            )
+
+        response_name = f'response.history.{is_paginated}.{page_size}.{request.GET.get("cursor")}'
+        version, cached_data = _get_cached_response_data(user, response_name)
+        etag = _get_user_etag(user, version, response_name)
+        not_modified_response = _get_not_modified_response(request, etag)
+        if not_modified_response is not None:
+            return not_modified_response
+
+        if cached_data is not None:
+            return Response(cached_data, headers={'ETag': etag})
+
+        if is_paginated:
+            try:
+                verified_names, next_cursor = get_verified_name_history_page(
+                    user,
+                    page_size=int(page_size) if page_size else None,
+                    cursor=request.GET.get('cursor'),
+                )
+            except VerifiedNameHistoryInvalidCursor as exc:
+                return Response(status=http_status.HTTP_400_BAD_REQUEST, data={'detail': str(exc)})
+            verified_names = VerifiedName.prefetch_verification_attempt_statuses(verified_names)
+            results = VerifiedNameSerializer(verified_names, many=True).data
+        else:
+            # the full history is read without instantiating a VerifiedName per row
+            results = serialize_verified_names(get_verified_name_history(user))
 
         serialized_data = {
             'use_verified_name_for_certs': should_use_verified_name_for_certs(user),
-            'results': serializer.data,
+            'results': results,
+        }
+        if is_paginated:
+            serialized_data['next_cursor'] = next_cursor
+
+        response = Response(serialized_data, headers={'ETag': etag})
+        _cache_response(user, version, response_name, response)
+        return response
+
+
+class VerifiedNameBulkView(AuthenticatedAPIView):
+    """
+    Endpoint for the VerifiedNames of many users.
+    /edx_name_affirmation/v1/verified_names/bulk
+
+    Supports:
+        HTTP POST: Return the most recent approved VerifiedName of each of the given users.
+
+    The users are resolved with a constant number of queries, however many are requested, and
+    the configuration cache is warmed for each of them.
+    """
+    @schema(
+        body=BulkVerifiedNameRequestSerializer(),
+        responses={
+            200: 'The approved verified_name records associated with the users provided',
+            400: 'The POSTed data failed validation rules',
+            403: 'User lacks required permission. Only an edX staff user can invoke this API',
+        },
+    )
+    def post(self, request):
+        """
+        Get the most recent approved verified name of each of the given users
+        Example POST data: {
+            "usernames": ["jdoe", "bsmith"],
+            "user_ids": [123]
         }
+        Example response: {
+            "results": [
+                {
+                    "username": "jdoe",
+                    "verified_name": "Jonathan Doe",
+                    "profile_name": "Jon Doe",
+                    "verification_attempt_id": 123,
+                    "proctored_exam_attempt_id": None,
+                    "status": "approved",
+                    "use_verified_name_for_certs": False,
+                }
+            ]
+        }
+        Users without an approved verified name are not included in the results.
+        """
+        if not request.user.is_staff:
+            return Response(
+                status=http_status.HTTP_403_FORBIDDEN,
+                data={'detail': 'Must be a staff user to perform this request.'}
+            )
 
-        return Response(serialized_data)
+        request_serializer = BulkVerifiedNameRequestSerializer(data=request.data)
+        if not request_serializer.is_valid():
+            return Response(status=http_status.HTTP_400_BAD_REQUEST, data=request_serializer.errors)
+
+        users = get_user_model().objects.filter(
+            Q(username__in=request_serializer.validated_data['usernames'])
+            | Q(id__in=request_serializer.validated_data['user_ids'])
+        ).order_by('id')
+        users_by_id = {user.id: user for user in users}
+
+        configs = get_verified_name_configs(users_by_id.values())
+        verified_names = get_verified_names(users_by_id, is_verified=True)
+        for user_id, verified_name in verified_names.items():
+            # avoid a query per verified name when the serializer reads the username
+            verified_name.user = users_by_id[user_id]
+        VerifiedName.prefetch_verification_attempt_statuses(verified_names.values())
+
+        results = []
+        for user_id in users_by_id:
+            if user_id in verified_names:
+                serialized_data = VerifiedNameSerializer(verified_names[user_id]).data
+                serialized_data['use_verified_name_for_certs'] = configs[user_id].use_verified_name_for_certs
+                results.append(serialized_data)
+
+        return Response({'results': results})
 
 
 class VerifiedNameConfigView(AuthenticatedAPIView):